@@ -57,6 +57,14 @@ class Config:
 
         self.chunk_size = int(os.getenv("CHUNK_SIZE", "1024"))
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200"))
+        # Number of embedding requests sent concurrently during ingestion
+        self.embedding_concurrency = max(
+            1, int(os.getenv("LOAD_EMBEDDING_CONCURRENCY", "4"))
+        )
+        # Worker threads used to chunk document sections during ingestion
+        self.indexer_workers = max(
+            1, int(os.getenv("INDEXER_WORKERS", (os.cpu_count() or 2) - 1))
+        )
 
         # RAG Prompt Template
 
@@ -429,13 +429,20 @@ async def user_query(
                 )
 
                 # Check if session is currently shared/public before adding message
+                # Both calls below are blocking HTTP requests, so run them off
+                # the event loop to keep other requests flowing while they wait
+                loop = asyncio.get_running_loop()
                 is_session_public = False
                 if session_share_service and bot_id:
                     try:
-                        is_session_public = session_share_service.is_session_public(
-                            session_id=session_id,
-                            user_id=user_id,
-                            bot_id=bot_id,
+                        is_session_public = await loop.run_in_executor(
+                            None,
+                            partial(
+                                session_share_service.is_session_public,
+                                session_id=session_id,
+                                user_id=user_id,
+                                bot_id=bot_id,
+                            ),
                         )
                         if is_session_public:
                             logger.info(
@@ -448,8 +455,14 @@ async def user_query(
                         )
 
                 # Attempt to save to chat history service
-                result = chat_history_service.add_message(
-                    chat_history, message_id=message_id, is_public=is_session_public
+                result = await loop.run_in_executor(
+                    None,
+                    partial(
+                        chat_history_service.add_message,
+                        chat_history,
+                        message_id=message_id,
+                        is_public=is_session_public,
+                    ),
                 )
                 # Create the base response dictionary
                 bot_response_dict = bot_response.model_dump()
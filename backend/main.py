@@ -1,6 +1,7 @@
 from manager.rag_orchestration import RAGOrchestrator
 from config import Config
 from fastapi import (
+    BackgroundTasks,
     FastAPI,
     UploadFile,
     File,
@@ -23,6 +24,7 @@ from pathlib import Path
 import json
 import aiofiles
 import csv
+import gzip
 import io
 import base64
 import re
@@ -366,6 +368,7 @@ def get_azure_search_service():
 )
 async def get_user_session_titles(
     request: Request,
+    background_tasks: BackgroundTasks,
     after_timestamp: Optional[str] = None,
 ):
     """
@@ -427,6 +430,18 @@ async def get_user_session_titles(
         )
 
         if result["success"]:
+            # Warm the chat memory for the listed sessions after responding,
+            # so opening one of them doesn't wait on a history fetch
+            session_ids = list(
+                (result["data"] or {}).get("SessionID_title_map", {}).keys()
+            )
+            if orchestrator and session_ids:
+                background_tasks.add_task(
+                    orchestrator.memory_manager.prefetch_sessions,
+                    session_ids,
+                    user_id,
+                    bot_id,
+                )
             return JSONResponse(status_code=status.HTTP_200_OK, content=result["data"])
         else:
             logger.error(
@@ -2276,13 +2291,21 @@ async def export_chat_history(request: Request):
                         }
                     )
                 session_number += 1
+            csv_bytes = output.getvalue().encode("utf-8")
+            csv_headers = {
+                "Content-Disposition": f"attachment; filename=chat_history_{user_id}_{period}.csv",
+                "Vary": "Accept-Encoding",
+            }
+            # CSV text compresses several-fold; the DOCX and PDF exports below
+            # are already compressed formats and are sent as-is
+            if "gzip" in request.headers.get("accept-encoding", ""):
+                csv_bytes = gzip.compress(csv_bytes, compresslevel=6)
+                csv_headers["Content-Encoding"] = "gzip"
             # Return CSV as a streaming response
             return StreamingResponse(
-                io.BytesIO(output.getvalue().encode("utf-8")),
+                io.BytesIO(csv_bytes),
                 media_type="text/csv",
-                headers={
-                    "Content-Disposition": f"attachment; filename=chat_history_{user_id}_{period}.csv"
-                },
+                headers=csv_headers,
             )
 
         elif export_format.lower() == "word" or export_format.lower() == "docx":
@@ -2606,9 +2629,9 @@ async def create_session_share(
                 status_code=503, detail="Chat history service not available"
             )
 
-        # Check if session exists and user owns it
+        # Check if session exists and user owns it; one message is enough
         result = chat_history_service.get_user_session(
-            userID=user_id, sessionID=session_id, bot_id=config.bot_id
+            userID=user_id, sessionID=session_id, bot_id=config.bot_id, limit=1
         )
 
         if not result["success"]:
@@ -2674,9 +2697,9 @@ async def revoke_session_share(session_id: str, request: Request):
                 status_code=503, detail="Chat history service not available"
             )
 
-        # Check if session exists and user owns it
+        # Check if session exists and user owns it; one message is enough
         result = chat_history_service.get_user_session(
-            userID=user_id, sessionID=session_id, bot_id=config.bot_id
+            userID=user_id, sessionID=session_id, bot_id=config.bot_id, limit=1
         )
 
         if not result["success"]:
@@ -2812,9 +2835,9 @@ async def get_session_share_info(session_id: str, request: Request):
                 status_code=503, detail="Chat history service not available"
             )
 
-        # Check if session exists and user owns it
+        # Check if session exists and user owns it; one message is enough
         result = chat_history_service.get_user_session(
-            userID=user_id, sessionID=session_id, bot_id=config.bot_id
+            userID=user_id, sessionID=session_id, bot_id=config.bot_id, limit=1
         )
 
         if not result["success"]:
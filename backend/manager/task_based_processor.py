@@ -1044,6 +1044,7 @@ class FileProcessor:
             # If so, skip indexing but still mark as completed
             file_extension = Path(original_filename).suffix.lower()
             base_name = original_filename.rsplit(".", 1)[0]
+            pdf_bytes = None
 
             if file_extension == ".pdf":
                 with open(file_path, "rb") as f:
@@ -1143,6 +1144,7 @@ class FileProcessor:
                     metadata_row=metadata_row,  # Pass only CSV metadata to indexer (None if filters disabled)
                     progress_callback=progress_callback,
                     use_chapter_chunking=self.config.use_chapter_chunking,  # Enable chapter-based chunking for Word documents
+                    file_bytes=pdf_bytes,  # PDFs were already read above; avoid a second read
                 )
                 if not success:
                     raise ValueError(f"File processing failed for {original_filename}")
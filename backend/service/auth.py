@@ -6,9 +6,9 @@ This module provides JWT token validation and role-based access control.
 
 import jwt
 import requests
-from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 import base64
+import time
 from typing import Dict, Any
 from fastapi import HTTPException, status
 from config import Config
@@ -21,6 +21,11 @@ logger = logging.getLogger("main")
 class JWTAuthService:
     """Azure AD JWT Authentication Service using Managed Identity for validation"""
 
+    # Seconds the signing keys are cached, and the least time between two
+    # fetches forced by a token signed with a key we have not seen yet
+    JWKS_CACHE_TTL = 3600
+    JWKS_MIN_REFRESH_INTERVAL = 300
+
     def __init__(self, config: Config):
         """Initialize the JWT service with Azure AD configuration"""
         self.tenant_id = config.azure_ad_tenant_id
@@ -40,27 +45,39 @@ class JWTAuthService:
         # Cache for public keys
         self._public_keys_cache = None
         self._cache_timestamp = None
+        self._last_forced_refresh = float("-inf")
 
         logger.info(f"JWT Auth Service initialized for tenant: {self.tenant_id}")
         logger.info(f"Expected audience: {self.audience}")
         logger.info(f"JWKS URL: {self.jwks_url}")
         logger.info(f"Issuer: {self.issuer}")
 
-    def _get_public_keys(self) -> Dict[str, Any]:
+    def _get_public_keys(self, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Fetch and cache Azure AD public keys for JWT validation.
         Uses simple time-based caching to avoid excessive API calls.
-        """
-        import time
 
-        # Simple cache check (cache for 1 hour)
-        current_time = time.time()
+        Keys are cached as parsed RSA key objects, so tokens are verified
+        locally without parsing a key on every request.
+
+        Args:
+            force_refresh: Fetch again before the cache expires (used when Azure
+                AD has rotated its keys), at most once per JWKS_MIN_REFRESH_INTERVAL
+        """
+        # Simple cache check (cache for JWKS_CACHE_TTL seconds)
+        current_time = time.monotonic()
         if (
             self._public_keys_cache is not None
             and self._cache_timestamp is not None
-            and current_time - self._cache_timestamp < 3600
+            and current_time - self._cache_timestamp < self.JWKS_CACHE_TTL
         ):
-            return self._public_keys_cache
+            if (
+                not force_refresh
+                or current_time - self._last_forced_refresh
+                < self.JWKS_MIN_REFRESH_INTERVAL
+            ):
+                return self._public_keys_cache
+            self._last_forced_refresh = current_time
 
         try:
             logger.info(f"Fetching public keys from: {self.jwks_url}")
@@ -86,15 +103,7 @@ class JWTAuthService:
                     e_int = int.from_bytes(e, "big")
 
                     # Create RSA public key
-                    public_key = rsa.RSAPublicNumbers(e_int, n_int).public_key()
-
-                    # Convert to PEM format
-                    pem_key = public_key.public_bytes(
-                        encoding=serialization.Encoding.PEM,
-                        format=serialization.PublicFormat.SubjectPublicKeyInfo,
-                    )
-
-                    public_keys[kid] = pem_key
+                    public_keys[kid] = rsa.RSAPublicNumbers(e_int, n_int).public_key()
 
                 except Exception as key_error:
                     logger.warning(f"Failed to process key {kid}: {key_error}")
@@ -146,6 +155,9 @@ class JWTAuthService:
 
             # Get public keys
             public_keys = self._get_public_keys()
+            if kid not in public_keys:
+                # Azure AD may have rotated its signing keys since we cached them
+                public_keys = self._get_public_keys(force_refresh=True)
 
             if kid not in public_keys:
                 logger.warning(f"Unknown key ID: {kid}")
@@ -167,6 +179,7 @@ class JWTAuthService:
                         "verify_exp": True,
                         "verify_aud": True,
                         "verify_iss": True,
+                        "require": ["exp", "iat"],
                     },
                 )
 
@@ -36,6 +36,18 @@ from llama_index.vector_stores.azureaisearch import (
     MetadataIndexFieldType,
 )
 
+try:
+    import orjson
+
+    def _check_serializable(doc: Dict[str, Any]) -> None:
+        orjson.dumps(doc, option=orjson.OPT_NON_STR_KEYS)
+
+except ImportError:
+    # Fallback if orjson isn't installed
+    def _check_serializable(doc: Dict[str, Any]) -> None:
+        json.dumps(doc)
+
+
 # Import embedding client for query embedding generation
 from service.llm_client import EmbeddingClient
 
@@ -419,7 +431,7 @@ class AzureAISearchService:
         cleaned = []
         for doc in docs:
             try:
-                json.dumps(doc)
+                _check_serializable(doc)
                 cleaned.append(doc)
             except (TypeError, ValueError) as e:
                 logger.warning(f"Skipping non-serializable document: {e}")
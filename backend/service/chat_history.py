@@ -493,8 +493,13 @@ class ChatHistoryService:
         UserID: Optional[str] = None,
         SessionID: Optional[str] = None,
         BotID: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0,
     ) -> Dict[str, Any]:
-        """Get all messages for a specific session using the dedicated session messages endpoint"""
+        """Get messages for a specific session using the dedicated session messages endpoint.
+
+        ``limit`` and ``offset`` select a page; the defaults fetch up to 1000 messages.
+        """
         try:
             # Support both ChatHistoryQuery object and keyword arguments
             if query:
@@ -517,10 +522,10 @@ class ChatHistoryService:
             endpoint = f"/v1/bots/{bot_id_val}/users/{user_id_val}/sessions/{session_id_val}/messages"
             url = f"{self.BASE_URL}{endpoint}"
 
-            # Parameters for pagination (get all messages)
+            # Parameters for pagination
             params = {
-                "limit": 1000,  # Get up to 1000 messages
-                "offset": 0,
+                "limit": limit,
+                "offset": offset,
             }
 
             response = self.session.get(url, params=params, timeout=self.timeout)
@@ -851,49 +856,7 @@ class ChatHistoryService:
                 - data: Response data from the service
                 - error: Error message if operation failed
         """
-        try:
-            url = f"{self.BASE_URL}/v1/bots/{bot_id}/users/{user_id}/sessions/{session_id}/public"
-
-            # PATCH request to mark session as public
-            # The endpoint requires SessionID, BotID, UserID, and public: true in the body
-            payload = {
-                "SessionID": session_id,
-                "BotID": bot_id,
-                "UserID": user_id,
-                "public": True,
-            }
-
-            response = self.session.patch(url, json=payload, timeout=self.timeout)
-
-            if response.status_code in [200, 204]:
-                result = response.json() if response.content else {}
-                return {"success": True, "data": result}
-            else:
-                error_text = response.text
-                logger.error(
-                    f"[ERROR] [SESSION PATCH] Failed with status {response.status_code}: {error_text}"
-                )
-                return {
-                    "success": False,
-                    "error": f"HTTP {response.status_code}: {error_text}",
-                }
-
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"[ERROR] [SESSION PATCH] Connection error: {str(e)}")
-            return {
-                "success": False,
-                "error": f"Connection error: {str(e)}. External service may not be running.",
-            }
-        except requests.exceptions.Timeout as e:
-            logger.error(f"[ERROR] [SESSION PATCH] Timeout error: {str(e)}")
-            return {"success": False, "error": f"Timeout error: {str(e)}"}
-        except requests.exceptions.RequestException as e:
-            logger.error(f"[ERROR] [SESSION PATCH] Request error: {str(e)}")
-            return {"success": False, "error": f"Request error: {str(e)}"}
-        except Exception as e:
-            logger.error(f"[ERROR] [SESSION PATCH] Unexpected error: {str(e)}")
-            logger.exception("Full exception details:")
-            return {"success": False, "error": f"Unexpected error: {str(e)}"}
+        return self._patch_session_public(session_id, user_id, bot_id, public=True)
 
     def patch_session_make_private(
         self, session_id: str, user_id: str, bot_id: str
@@ -913,16 +876,26 @@ class ChatHistoryService:
                 - data: Response data from the service
                 - error: Error message if operation failed
         """
+        return self._patch_session_public(session_id, user_id, bot_id, public=False)
+
+    def _patch_session_public(
+        self, session_id: str, user_id: str, bot_id: str, public: bool
+    ) -> Dict[str, Any]:
+        """
+        Set the public flag on every message of a session with a single request.
+
+        The chat history service applies the flag to all of the session's
+        messages server-side, so the backend never patches messages one by one.
+        """
         try:
             url = f"{self.BASE_URL}/v1/bots/{bot_id}/users/{user_id}/sessions/{session_id}/public"
 
-            # PATCH request to mark session as private
-            # The endpoint requires SessionID, BotID, UserID, and public: false in the body
+            # The endpoint requires SessionID, BotID, UserID, and public in the body
             payload = {
                 "SessionID": session_id,
                 "BotID": bot_id,
                 "UserID": user_id,
-                "public": False,
+                "public": public,
             }
 
             response = self.session.patch(url, json=payload, timeout=self.timeout)
@@ -1,10 +1,16 @@
 import fitz  # PyMuPDF
+import functools
+import hashlib
 import math
 import os
 import io
 import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple
 from docx import Document
+from docx.oxml.ns import qn
 from docx.oxml.text.paragraph import CT_P
 from docx.table import Table
 from docx.text.paragraph import Paragraph
@@ -15,6 +21,179 @@ import re
 
 logger = logging.getLogger(__name__)
 
+_FOOTNOTE_RE = re.compile(r"footnote-(\d+)")
+
+# DOCX heading patterns fused into one alternation so plain content lines cost
+# a single match attempt. Sections and sub-sections share one branch that also
+# captures the leading chapter number.
+_HEADING_RE = re.compile(
+    r"^(?:Chapter\s+(?P<chapter>\d+)\s*[-–]?\s*.*"
+    r"|(?P<section>(?P<section_chapter>\d+)\.\d+(?:\.\d+)?)\s+.+"
+    r"|(?P<main>\d+)\.\s+.+)$",
+    re.IGNORECASE,
+)
+# TOC entries end with a tab followed by the page number
+_TOC_PAGEREF_RE = re.compile(r"\t\d+$")
+
+# chunk_type used for pieces of a section that had to be split. Literal
+# strings are interned, unlike the equivalent f"{chunk_type}_split".
+_SPLIT_CHUNK_TYPES = {
+    "section": "section_split",
+    "chapter_intro": "chapter_intro_split",
+    "chapter_content": "chapter_content_split",
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _clean_text(text: str) -> str:
+    """Normalize whitespace in text (memoized, shared by the processors)."""
+    # Basic text cleaning
+    text = text.strip()
+    # Remove excessive whitespace
+    return " ".join(text.split())
+
+
+def _collect_fn_idxs(line: str, refs: set) -> None:
+    """Record the zero-based footnote indexes referenced in a line."""
+    refs.update(int(m) - 1 for m in _FOOTNOTE_RE.findall(line))
+
+
+# Chapter-based chunking limits: safe limit below the 8192 token max, with a
+# rough estimation of ~4 characters per token
+_MAX_CHUNK_TOKENS = 6000
+_MAX_CHUNK_CHARS = _MAX_CHUNK_TOKENS * 4
+
+
+def _split_large_content(content, section_number, chapter, chunk_type):
+    """Split large content into smaller chunks if it exceeds token limit"""
+    if len(content) <= _MAX_CHUNK_CHARS:
+        content = content.strip()
+        if content:
+            yield {
+                "section_number": section_number,
+                "content": content,
+                "chapter": chapter,
+                "chunk_type": chunk_type,
+            }
+        return
+
+    # Pack whole paragraphs into chunks under the limit; only a paragraph that
+    # is too large on its own is split into fixed-size word windows
+    words_per_chunk = _MAX_CHUNK_TOKENS // 6  # Conservative estimate
+    text_chunks = []
+    bucket = []
+    bucket_len = 0
+    for paragraph in content.split("\n\n"):
+        if len(paragraph) > _MAX_CHUNK_CHARS:
+            if bucket:
+                text_chunks.append("\n\n".join(bucket))
+                bucket = []
+                bucket_len = 0
+            words = paragraph.split()
+            text_chunks.extend(
+                " ".join(words[i : i + words_per_chunk])
+                for i in range(0, len(words), words_per_chunk)
+            )
+            continue
+        # Account for the "\n\n" separator when joining
+        if bucket and bucket_len + 2 + len(paragraph) > _MAX_CHUNK_CHARS:
+            text_chunks.append("\n\n".join(bucket))
+            bucket = []
+            bucket_len = 0
+        bucket_len += len(paragraph) + (2 if bucket else 0)
+        bucket.append(paragraph)
+    if bucket:
+        text_chunks.append("\n\n".join(bucket))
+
+    for text_chunk in text_chunks:
+        text_chunk = text_chunk.strip()
+        if text_chunk:
+            yield {
+                "section_number": section_number,
+                "content": text_chunk,
+                "chapter": chapter,
+                "chunk_type": _SPLIT_CHUNK_TYPES[chunk_type],
+            }
+
+
+def _iter_chunks_for_chapter(chapter_key, chapter_content):
+    """Yield the non-empty chunks of a single chapter"""
+    # Determine if this is a chapter or a section
+    if chapter_key.startswith("Chapter"):
+        chapter_name = chapter_key
+
+        if isinstance(chapter_content, dict):
+            # Process all sections within this chapter
+            for section_key, section_content in chapter_content.items():
+                if section_key != "content" and section_content:
+                    # This is a section (e.g., "1.1", "1.2") within the chapter
+                    yield from _split_large_content(
+                        section_content,
+                        section_key,
+                        chapter_name,
+                        "section",
+                    )
+
+            # Process chapter-level content if exists
+            if "content" in chapter_content and chapter_content["content"]:
+                yield from _split_large_content(
+                    chapter_content["content"],
+                    chapter_name,
+                    chapter_name,
+                    "chapter_intro",
+                )
+        else:
+            # Direct content for chapter
+            if chapter_content:
+                yield from _split_large_content(
+                    chapter_content,
+                    chapter_name,
+                    chapter_name,
+                    "chapter_content",
+                )
+    else:
+        # This is a chapter number (like "1", "2") from main_chapter_pattern match
+        chapter_name = f"Chapter {chapter_key}"
+
+        if isinstance(chapter_content, dict):
+            # Process all sections within this chapter individually
+            for section_key, section_content in chapter_content.items():
+                if section_key != "content" and section_content:
+                    # Each section gets its own chunk with proper section number
+                    yield from _split_large_content(
+                        section_content,
+                        section_key,  # Use actual section number (2.1, 2.2.1, etc.)
+                        chapter_name,
+                        "section",
+                    )
+
+            # Process chapter-level content if exists
+            if "content" in chapter_content and chapter_content["content"]:
+                yield from _split_large_content(
+                    chapter_content["content"],
+                    chapter_key,  # Use chapter number as section for intro content
+                    chapter_name,
+                    "chapter_intro",
+                )
+        else:
+            # Direct content for chapter
+            if chapter_content:
+                yield from _split_large_content(
+                    chapter_content, chapter_key, chapter_name, "section"
+                )
+
+
+def _chunk_chapter(chapter_item):
+    """Chunk one (chapter_key, chapter_content) item; picklable for process pools"""
+    return list(_iter_chunks_for_chapter(*chapter_item))
+
+
+def _chapter_size(chapter_content) -> int:
+    """Number of characters of text held by a chapter entry"""
+    if isinstance(chapter_content, dict):
+        return sum(len(section) for section in chapter_content.values() if section)
+    return len(chapter_content) if chapter_content else 0
+
 
 class PDFProcessor:
     def __init__(self, blob_service=None):
@@ -201,17 +380,17 @@ class PDFProcessor:
         Returns:
             List of text chunks
         """
-        if not text or not text.strip():
+        if not text:
             return []
 
+        # str.split() already drops surrounding whitespace, so blank text
+        # yields no words and no chunks without a separate strip() copy
         words = text.split()
-        chunks = []
 
-        for i in range(0, len(words), words_per_chunk):
-            chunk = " ".join(words[i : i + words_per_chunk])
-            chunks.append(chunk)
-
-        return chunks
+        return [
+            " ".join(words[i : i + words_per_chunk])
+            for i in range(0, len(words), words_per_chunk)
+        ]
 
     def clean_text(self, text: str) -> str:
         """
@@ -226,12 +405,7 @@ class PDFProcessor:
         if not text:
             return ""
 
-        # Basic text cleaning
-        text = text.strip()
-        # Remove excessive whitespace
-        text = " ".join(text.split())
-
-        return text
+        return _clean_text(text)
 
     def chunk_pdf_file_pages(self, file, chunk_size, chunk_index):
         """Yield a chunk of a PDF file by pages."""
@@ -293,9 +467,16 @@ class WordProcessor:
     Supports chapter-based chunking for structured documents.
     """
 
+    # Maximum number of chapter dicts whose chunks are kept in _chunk_cache
+    CHUNK_CACHE_SIZE = 16
+    # Documents at least this large are chunked in a process pool
+    PARALLEL_CHUNKING_MIN_CHAPTERS = 4
+    PARALLEL_CHUNKING_MIN_CHARS = 2_000_000
+
     def __init__(self):
         """Initialize the Word processor."""
-        pass
+        # Chunks produced by chapter_based_chunking, keyed by content digest
+        self._chunk_cache: Dict[str, List[Dict[str, str]]] = {}
 
     def iter_word_document(
         self, docx_bytes: bytes, report_dir: str
@@ -644,17 +825,41 @@ class WordProcessor:
         Returns:
             List of text chunks
         """
-        if not text or not text.strip():
+        if not text:
             return []
 
+        # str.split() already drops surrounding whitespace, so blank text
+        # yields no words and no chunks without a separate strip() copy
         words = text.split()
-        chunks = []
 
-        for i in range(0, len(words), words_per_chunk):
-            chunk = " ".join(words[i : i + words_per_chunk])
-            chunks.append(chunk)
+        return [
+            " ".join(words[i : i + words_per_chunk])
+            for i in range(0, len(words), words_per_chunk)
+        ]
 
-        return chunks
+    def chunk_text_lines(
+        self, lines: List[str], words_per_chunk: int = 250
+    ) -> List[str]:
+        """
+        Split a list of text lines into chunks of approximately the specified
+        number of words. Equivalent to chunk_text("\\n".join(lines)) without
+        building the joined string.
+
+        Args:
+            lines: Input text lines to chunk
+            words_per_chunk: Target number of words per chunk
+
+        Returns:
+            List of text chunks
+        """
+        words = []
+        for line in lines:
+            words.extend(line.split())
+
+        return [
+            " ".join(words[i : i + words_per_chunk])
+            for i in range(0, len(words), words_per_chunk)
+        ]
 
     def clean_text(self, text: str) -> str:
         """
@@ -669,12 +874,7 @@ class WordProcessor:
         if not text:
             return ""
 
-        # Basic text cleaning
-        text = text.strip()
-        # Remove excessive whitespace
-        text = " ".join(text.split())
-
-        return text
+        return _clean_text(text)
 
     def extract_chapters_from_markdown(self, docx_file_bytes):
         """Extract chapters and sections from DOCX by converting to markdown first"""
@@ -746,29 +946,33 @@ class WordProcessor:
                     logger.info("No TOC detected, processing all lines")
 
                 # Step 3: Extract chapters and sections from cleaned markdown
-                chapters = {}
+                chapters = defaultdict(dict)
                 current_chapter = None
                 current_section = None
-                current_content = []
+                current_content = io.StringIO()
+                # Footnote indexes referenced by the lines in current_content
+                footnote_refs = set()
 
                 for i, line in enumerate(clean_lines):
                     line_stripped = line.strip()
 
                     # Skip empty lines but preserve them in content
                     if not line_stripped:
-                        current_content.append(line)
+                        current_content.write(f"{line}\n")
                         continue
 
                     # Preserve bullet points and list items
                     if line_stripped.startswith(("- ", "* ", "• ", "+ ")):
-                        current_content.append(line)
+                        current_content.write(f"{line}\n")
+                        _collect_fn_idxs(line, footnote_refs)
                         continue
 
                     # Preserve numbered lists (but not section numbers)
                     if re.match(
                         r"^\d+\.\s+[A-Z][a-z]", line_stripped
                     ):  # "1. Something" but not "1.1"
-                        current_content.append(line)
+                        current_content.write(f"{line}\n")
+                        _collect_fn_idxs(line, footnote_refs)
                         continue
 
                     # Check for chapter headings (handle both regular dash and em dash)
@@ -777,30 +981,26 @@ class WordProcessor:
                     )
                     if chapter_match:
                         # Save previous section content if exists
-                        if current_section and current_content:
-                            if current_chapter not in chapters:
-                                chapters[current_chapter] = {}
+                        if current_section and current_content.tell():
                             if footnote_lines:
-                                for fn in re.findall(
-                                    r"footnote-\d+", "\n".join(current_content)
-                                ):
-                                    fn_idx = int(fn.split("-")[-1]) - 1
+                                for fn_idx in sorted(footnote_refs):
                                     if 0 <= fn_idx < len(footnote_lines):
-                                        current_content.append(
-                                            f"[Footnote {fn_idx + 1}] : {footnote_lines[fn_idx]}]"
+                                        current_content.write(
+                                            f"[Footnote {fn_idx + 1}] : {footnote_lines[fn_idx]}]\n"
                                         )
-                            chapters[current_chapter][current_section] = "\n".join(
-                                current_content
-                            ).strip()
-                            current_content = []
+                            chapters[current_chapter][current_section] = (
+                                current_content.getvalue().strip()
+                            )
+                            current_content = io.StringIO()
+                            footnote_refs.clear()
 
                         chapter_num = int(chapter_match.group(1))
                         chapter_title = chapter_match.group(2).strip()
                         current_chapter = f"Chapter {chapter_num}"
                         current_section = None
 
-                        if current_chapter not in chapters:
-                            chapters[current_chapter] = {}
+                        # Register the chapter even if it ends up without sections
+                        chapters.setdefault(current_chapter, {})
 
                         logger.info(f"Found {current_chapter}: {chapter_title}")
                         continue
@@ -811,22 +1011,18 @@ class WordProcessor:
                     )
                     if section_match:
                         # Save previous section content if exists
-                        if current_section and current_content:
-                            if current_chapter not in chapters:
-                                chapters[current_chapter] = {}
+                        if current_section and current_content.tell():
                             if footnote_lines:
-                                for fn in re.findall(
-                                    r"footnote-\d+", "\n".join(current_content)
-                                ):
-                                    fn_idx = int(fn.split("-")[-1]) - 1
+                                for fn_idx in sorted(footnote_refs):
                                     if 0 <= fn_idx < len(footnote_lines):
-                                        current_content.append(
-                                            f"[Footnote {fn_idx + 1}] : {footnote_lines[fn_idx]}]"
+                                        current_content.write(
+                                            f"[Footnote {fn_idx + 1}] : {footnote_lines[fn_idx]}]\n"
                                         )
-                            chapters[current_chapter][current_section] = "\n".join(
-                                current_content
-                            ).strip()
-                            current_content = []
+                            chapters[current_chapter][current_section] = (
+                                current_content.getvalue().strip()
+                            )
+                            current_content = io.StringIO()
+                            footnote_refs.clear()
 
                         section_num = section_match.group(1)
                         section_title = section_match.group(2).strip()
@@ -838,8 +1034,7 @@ class WordProcessor:
                                 f"Chapter {section_num.split('.')[0]}"
                             )
                             current_chapter = chapter_from_section
-                            if current_chapter not in chapters:
-                                chapters[current_chapter] = {}
+                            chapters.setdefault(current_chapter, {})
                             logger.info(
                                 f"Determined chapter from section {current_chapter}: {chapter_title}"
                             )
@@ -848,28 +1043,24 @@ class WordProcessor:
                         continue
 
                     # Add content to current section
-                    current_content.append(line)
+                    current_content.write(f"{line}\n")
+                    _collect_fn_idxs(line, footnote_refs)
 
                 # Save final section content
-                if current_section and current_content:
-                    if current_chapter not in chapters:
-                        chapters[current_chapter] = {}
+                if current_section and current_content.tell():
                     if footnote_lines:
-                        for fn in re.findall(
-                            r"footnote-\d+", "\n".join(current_content)
-                        ):
-                            fn_idx = int(fn.split("-")[-1]) - 1
+                        for fn_idx in sorted(footnote_refs):
                             if 0 <= fn_idx < len(footnote_lines):
-                                current_content.append(
-                                    f"[Footnote {fn_idx + 1}] : {footnote_lines[fn_idx]}]"
+                                current_content.write(
+                                    f"[Footnote {fn_idx + 1}] : {footnote_lines[fn_idx]}]\n"
                                 )
-                    chapters[current_chapter][current_section] = "\n".join(
-                        current_content
-                    ).strip()
+                    chapters[current_chapter][current_section] = (
+                        current_content.getvalue().strip()
+                    )
 
                 logger.info(f"Extracted {len(chapters)} chapters from markdown")
 
-                return chapters
+                return dict(chapters)
 
             finally:
                 # Clean up temporary file
@@ -883,107 +1074,87 @@ class WordProcessor:
     def extract_chapters_from_docx(self, docx_file_bytes):
         """Extract chapters and sections from DOCX file with their content"""
         try:
-            import re
-
             doc = Document(io.BytesIO(docx_file_bytes))
-            chapters = {}
+            chapters = defaultdict(dict)
             current_chapter = None
             current_section = None
-            chapter_content = []
-
-            # Regex patterns for chapter numbering - more restrictive to avoid false matches
-            chapter_pattern = re.compile(
-                r"^Chapter\s+(\d+)\s*[-–]?\s*(.*)$", re.IGNORECASE
+            chapter_content = io.StringIO()
+
+            # Stream top-level paragraphs from the body element instead of
+            # materializing doc.paragraphs, resolving text and style name once
+            # per paragraph so the loop below only works with plain strings
+            paragraphs = (
+                (p.text.strip(), p.style.name if p.style else "No Style")
+                for p in (
+                    Paragraph(element, doc)
+                    for element in doc.element.body.iterchildren(qn("w:p"))
+                )
             )
-            main_chapter_pattern = re.compile(r"^(\d+)\.\s+(.+)$")
-            section_pattern = re.compile(r"^(\d+\.\d+)\s+(.+)$")
-            sub_section_pattern = re.compile(r"^(\d+\.\d+\.\d+)\s+(.+)$")
 
-            for i, paragraph in enumerate(doc.paragraphs):
-                text = paragraph.text.strip()
+            # Bind hot-loop methods to locals; the buffer is reset in place
+            # (seek/truncate) so the bound write stays valid across sections
+            write = chapter_content.write
+            match_heading = _HEADING_RE.match
+            search_page_ref = _TOC_PAGEREF_RE.search
+
+            def flush(section_key):
+                """Save buffered text under section_key and reset the buffer"""
+                if current_chapter and section_key and chapter_content.tell():
+                    chapters[current_chapter][section_key] = (
+                        chapter_content.getvalue().rstrip("\n")
+                    )
+                chapter_content.seek(0)
+                chapter_content.truncate()
 
+            for i, (text, style_name) in enumerate(paragraphs):
                 if not text:
                     continue
 
                 # Skip table of contents entries
                 # TOC entries are typically in first ~200 paragraphs and have 'toc 2' style
                 # or end with page numbers (indicating TOC entries)
-                style_name = paragraph.style.name if paragraph.style else "No Style"
-                has_page_ref = bool(
-                    re.search(r"\t\d+$", text)
-                )  # Ends with tab and page number
-                is_likely_toc = i < 200 and (style_name == "toc 2" or has_page_ref)
-
-                if is_likely_toc:
-                    logger.debug("found TOC")
-                    continue
+                if i < 200:
+                    # Cheap tab check before running the page-number regex
+                    has_page_ref = "\t" in text and bool(search_page_ref(text))
+                    if style_name == "toc 2" or has_page_ref:
+                        logger.debug("found TOC")
+                        continue
 
                 # Check if this is a list item (bullet or numbered)
-                is_list_item = style_name and (
-                    "list" in style_name.lower() or "bullet" in style_name.lower()
-                )
-                if is_list_item:
+                style_lower = style_name.lower() if style_name else ""
+                if "list" in style_lower or "bullet" in style_lower:
                     # Preserve list formatting with bullet symbol
-                    chapter_content.append(f"• {text}")
+                    write(f"• {text}\n")
                     continue
 
-                # Check for Chapter (e.g., "Chapter 1 - Introduction")
-                chapter_match = chapter_pattern.match(text)
-                if chapter_match:
-                    # Save previous chapter content
-                    if current_chapter and chapter_content:
-                        if current_chapter not in chapters:
-                            chapters[current_chapter] = {}
-                        if current_section:
-                            chapters[current_chapter][current_section] = "\n".join(
-                                chapter_content
-                            )
-                        else:
-                            chapters[current_chapter]["content"] = "\n".join(
-                                chapter_content
-                            )
-
-                    # Start new chapter
-                    current_chapter = chapter_match.group(1)
-                    current_section = None
-                    chapter_content = []
-                    continue
+                # Headings start with "Chapter" or a digit; anything else is
+                # plain content and does not need the regex at all
+                first_char = text[0]
+                if first_char in "Cc" or first_char.isdecimal():
+                    heading_match = match_heading(text)
+                else:
+                    heading_match = None
+                heading_kind = heading_match.lastgroup if heading_match else None
 
-                # Check for main chapter (e.g., "1 Introduction")
-                main_match = main_chapter_pattern.match(text)
-                if main_match:
+                # Check for Chapter (e.g., "Chapter 1 - Introduction")
+                # or main chapter (e.g., "1. Introduction")
+                if heading_kind in ("chapter", "main"):
                     # Save previous chapter content
-                    if current_chapter and chapter_content:
-                        if current_chapter not in chapters:
-                            chapters[current_chapter] = {}
-                        if current_section:
-                            chapters[current_chapter][current_section] = "\n".join(
-                                chapter_content
-                            )
-                        else:
-                            chapters[current_chapter]["content"] = "\n".join(
-                                chapter_content
-                            )
+                    flush(current_section or "content")
 
                     # Start new chapter
-                    current_chapter = main_match.group(1)
+                    current_chapter = heading_match.group(heading_kind)
                     current_section = None
-                    chapter_content = []
                     continue
 
                 # Check for sub-section (e.g., "1.3.1 Sound Banking")
-                sub_sub_match = sub_section_pattern.match(text)
-                if sub_sub_match:
-                    section_number = sub_sub_match.group(1)
-                    chapter_from_section = section_number.split(".")[0]
+                # or section (e.g., "1.1 Overview")
+                if heading_kind == "section":
+                    section_number = heading_match.group("section")
+                    chapter_from_section = heading_match.group("section_chapter")
 
                     # Save previous section content if we have one
-                    if current_chapter and current_section and chapter_content:
-                        if current_chapter not in chapters:
-                            chapters[current_chapter] = {}
-                        chapters[current_chapter][current_section] = "\n".join(
-                            chapter_content
-                        )
+                    flush(current_section)
 
                     # Only switch to the chapter if it exists in our chapters dict
                     # Otherwise, keep the current chapter context
@@ -995,54 +1166,18 @@ class WordProcessor:
                         chapters[current_chapter] = {}
 
                     current_section = section_number
-                    chapter_content = []
-                    continue
-
-                # Check for section (e.g., "1.1 Overview")
-                sub_match = section_pattern.match(text)
-                if sub_match:
-                    section_number = sub_match.group(1)
-                    chapter_from_section = section_number.split(".")[0]
-
-                    # Save previous section content if we have one
-                    if current_chapter and current_section and chapter_content:
-                        if current_chapter not in chapters:
-                            chapters[current_chapter] = {}
-                        chapters[current_chapter][current_section] = "\n".join(
-                            chapter_content
-                        )
-
-                    # Only switch to the chapter if it exists in our chapters dict
-                    # Otherwise, keep the current chapter context
-                    if chapter_from_section in chapters:
-                        current_chapter = chapter_from_section
-                    elif current_chapter is None:
-                        # If no current chapter, create the chapter
-                        current_chapter = chapter_from_section
-                        chapters[current_chapter] = {}
-
-                    current_section = section_number
-                    chapter_content = []
                     continue
 
                 # Add content to current chapter/section
                 if current_chapter:
-                    chapter_content.append(text)
+                    write(f"{text}\n")
 
             # Save the last chapter content
-            if current_chapter and chapter_content:
-                if current_chapter not in chapters:
-                    chapters[current_chapter] = {}
-                if current_section:
-                    chapters[current_chapter][current_section] = "\n".join(
-                        chapter_content
-                    )
-                else:
-                    chapters[current_chapter]["content"] = "\n".join(chapter_content)
+            flush(current_section or "content")
 
             logger.info(f"Extracted {len(chapters)} main chapters from DOCX")
 
-            return chapters
+            return dict(chapters)
 
         except Exception as e:
             logger.error(f"Error extracting chapters from DOCX: {str(e)}")
@@ -1050,6 +1185,8 @@ class WordProcessor:
 
     def _debug_chapter_counts(self, chapters):
         """Debug method to count and log chapter statistics"""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         try:
             total_chapters = len(chapters)
             total_sections = 0
@@ -1059,9 +1196,7 @@ class WordProcessor:
             debug_info.append(f"Total Chapters Found: {total_chapters}")
 
             for chapter_num, chapter_data in chapters.items():
-                section_count = len(
-                    [key for key in chapter_data.keys() if key != "content"]
-                )
+                section_count = len(chapter_data) - ("content" in chapter_data)
                 total_sections += section_count
                 debug_info.append(f"Chapter {chapter_num}: {section_count} sections")
 
@@ -1079,169 +1214,106 @@ class WordProcessor:
 
     def _log_chapters_to_file(self, chapters):
         """Log extracted chapters to document_structure.md file for debugging"""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         try:
             from datetime import datetime
 
-            # Create the markdown content
-            md_content = ["# Document Structure - Extracted Chapters\n"]
-            md_content.append(
-                f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            )
-
-            for main_chapter, content in chapters.items():
-                md_content.append(f"## Chapter {main_chapter}\n")
-
-                if isinstance(content, dict):
-                    # Process sections
-                    for section, section_content in content.items():
-                        if section == "content":
-                            # Main chapter content
-                            if section_content:
-                                md_content.append("### Main Content\n")
-                                md_content.append(f"{section_content}\n\n")
-                        else:
-                            # Section content
-                            if section_content:
-                                md_content.append(f"### Section {section}\n")
-                                md_content.append(f"{section_content}\n\n")
-                else:
-                    # Direct content for main chapter
-                    if content:
-                        md_content.append(f"{content}\n\n")
-
-                md_content.append("---\n\n")
-
-            # Write to file in the project root
+            # Write the markdown straight to the file in the project root
+            # instead of assembling the whole document in memory first
             file_path = os.path.join(os.getcwd(), "document_structure.md")
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write("".join(md_content))
+            with open(file_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+                f.write("# Document Structure - Extracted Chapters\n")
+                f.write(f"Generated on: {datetime.now():%Y-%m-%d %H:%M:%S}\n\n")
+
+                for main_chapter, content in chapters.items():
+                    f.write(f"## Chapter {main_chapter}\n")
+
+                    if isinstance(content, dict):
+                        # Process sections
+                        for section, section_content in content.items():
+                            if section == "content":
+                                # Main chapter content
+                                if section_content:
+                                    f.write("### Main Content\n")
+                                    f.write(f"{section_content}\n\n")
+                            else:
+                                # Section content
+                                if section_content:
+                                    f.write(f"### Section {section}\n")
+                                    f.write(f"{section_content}\n\n")
+                    else:
+                        # Direct content for main chapter
+                        if content:
+                            f.write(f"{content}\n\n")
+
+                    f.write("---\n\n")
 
         except Exception as e:
             logger.warning(f"Warning: Could not log chapters to file: {str(e)}")
             # Don't raise - this is just for debugging, shouldn't break the main flow
 
     def chapter_based_chunking(self, chapters_dict):
+        """Create chunks based on chapters and sections, reusing cached results
+
+        Chunks for a chapters dict that was already fully chunked are served
+        from the cache instead of being split again (e.g. on re-index).
+        """
+        # repr keeps dict order, which determines chunk order
+        cache_key = hashlib.blake2b(repr(chapters_dict).encode("utf-8")).hexdigest()
+        cached_chunks = self._chunk_cache.get(cache_key)
+        if cached_chunks is not None:
+            for chunk in cached_chunks:
+                yield dict(chunk)
+            return
+
+        chunks = []
+        for chunk in self._iter_chapter_chunks(chapters_dict):
+            chunks.append(chunk)
+            yield dict(chunk)
+
+        if len(self._chunk_cache) >= self.CHUNK_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del self._chunk_cache[next(iter(self._chunk_cache))]
+        self._chunk_cache[cache_key] = chunks
+
+    def _iter_chapter_chunks(self, chapters_dict):
         """Create chunks based on chapters and sections with token limit handling
 
         Expected structure:
         - Chapters are main organizational units (Chapter 1, Chapter 2, etc.)
         - Sections are content units for chunking (1.1, 1.2, 2.1, 2.2, etc.)
         - Sub-sections are included with their parent sections (1.1.1, 1.1.2, etc.)
+
+        Chunks are yielded one at a time; empty chunks are skipped.
         """
         try:
-            chunks = []
-            max_tokens = 6000  # Safe limit below 8192 token max
-
-            def estimate_tokens(text):
-                # Rough estimation: ~4 characters per token
-                return len(text) // 4
-
-            def split_large_content(content, section_number, chapter, chunk_type):
-                """Split large content into smaller chunks if it exceeds token limit"""
-                if estimate_tokens(content) <= max_tokens:
-                    return [
-                        {
-                            "section_number": section_number,
-                            "content": content.strip(),
-                            "chapter": chapter,
-                            "chunk_type": chunk_type,
-                        }
-                    ]
-
-                # Use existing chunk_text method to split large content
-                # Adjust words_per_chunk to stay under token limit
-                words_per_chunk = max_tokens // 6  # Conservative estimate
-                text_chunks = self.chunk_text(content, words_per_chunk=words_per_chunk)
-
-                result_chunks = []
-                for text_chunk in text_chunks:
-                    result_chunks.append(
-                        {
-                            "section_number": f"{section_number}",
-                            "content": text_chunk.strip(),
-                            "chapter": chapter,
-                            "chunk_type": f"{chunk_type}_split",
-                        }
-                    )
-
-                return result_chunks
-
-            # Process the chapters dictionary
-            for chapter_key, chapter_content in chapters_dict.items():
-                # Determine if this is a chapter or a section
-                if chapter_key.startswith("Chapter"):
-                    chapter_name = chapter_key
-
-                    if isinstance(chapter_content, dict):
-                        # Process all sections within this chapter
-                        for section_key, section_content in chapter_content.items():
-                            if section_key != "content" and section_content:
-                                # This is a section (e.g., "1.1", "1.2") within the chapter
-                                split_chunks = split_large_content(
-                                    section_content,
-                                    section_key,
-                                    chapter_name,
-                                    "section",
-                                )
-                                chunks.extend(split_chunks)
-
-                        # Process chapter-level content if exists
-                        if "content" in chapter_content and chapter_content["content"]:
-                            split_chunks = split_large_content(
-                                chapter_content["content"],
-                                chapter_name,
-                                chapter_name,
-                                "chapter_intro",
-                            )
-                            chunks.extend(split_chunks)
-                    else:
-                        # Direct content for chapter
-                        if chapter_content:
-                            split_chunks = split_large_content(
-                                chapter_content,
-                                chapter_name,
-                                chapter_name,
-                                "chapter_content",
-                            )
-                            chunks.extend(split_chunks)
-                else:
-                    # This is a chapter number (like "1", "2") from main_chapter_pattern match
-                    chapter_name = f"Chapter {chapter_key}"
-
-                    if isinstance(chapter_content, dict):
-                        # Process all sections within this chapter individually
-                        for section_key, section_content in chapter_content.items():
-                            if section_key != "content" and section_content:
-                                # Each section gets its own chunk with proper section number
-                                split_chunks = split_large_content(
-                                    section_content,
-                                    section_key,  # Use actual section number (2.1, 2.2.1, etc.)
-                                    chapter_name,
-                                    "section",
-                                )
-                                chunks.extend(split_chunks)
-
-                        # Process chapter-level content if exists
-                        if "content" in chapter_content and chapter_content["content"]:
-                            split_chunks = split_large_content(
-                                chapter_content["content"],
-                                chapter_key,  # Use chapter number as section for intro content
-                                chapter_name,
-                                "chapter_intro",
-                            )
-                            chunks.extend(split_chunks)
-                    else:
-                        # Direct content for chapter
-                        if chapter_content:
-                            split_chunks = split_large_content(
-                                chapter_content, chapter_key, chapter_name, "section"
-                            )
-                            chunks.extend(split_chunks)
-
-            # Filter out empty chunks
-            chunks = [chunk for chunk in chunks if chunk["content"]]
-
-            return chunks
+            chapter_items = chapters_dict.items()
+            total_chars = sum(
+                _chapter_size(chapter_content)
+                for chapter_content in chapters_dict.values()
+            )
+            if (
+                len(chapters_dict) < self.PARALLEL_CHUNKING_MIN_CHAPTERS
+                or total_chars < self.PARALLEL_CHUNKING_MIN_CHARS
+            ):
+                for chapter_key, chapter_content in chapter_items:
+                    yield from _iter_chunks_for_chapter(chapter_key, chapter_content)
+                return
+
+            # Very large document: chapters are independent, so split them in
+            # worker processes. "spawn" avoids forking a multi-threaded server.
+            max_workers = min(os.cpu_count() or 1, len(chapters_dict))
+            logger.info(
+                f"Chunking {len(chapters_dict)} chapters ({total_chars} chars) "
+                f"with {max_workers} worker processes"
+            )
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                for chapter_chunks in executor.map(_chunk_chapter, chapter_items):
+                    yield from chapter_chunks
 
         except Exception as e:
             logger.error(f"Error creating section-based chunks: {str(e)}")
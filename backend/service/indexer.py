@@ -1,19 +1,21 @@
 # indexer.py
 import os
+import mmap
 import uuid
 import time
+import secrets
+import itertools
 import json
 import logging
-from typing import List, Dict, Any
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 import pandas as pd
-from io import StringIO
-from datetime import datetime
-from filelock import FileLock
+from datetime import datetime, timezone
 
 from io import BytesIO
 
 from config import Config
-from model import SearchDocument
 from .llm_client import LLMClient
 from .azure_ai_search import AzureAISearchService
 from .blob_storage import BlobStorageService
@@ -21,6 +23,33 @@ from .file_processor import PDFProcessor, WordProcessor
 
 logger = logging.getLogger(__name__)
 
+# Chunk IDs are a per-process random prefix plus a counter, so generating one
+# doesn't need a call into the OS random source for every chunk
+_CHUNK_ID_PREFIX = secrets.token_hex(8)
+_chunk_id_counter = itertools.count()
+
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    def _json_dumps_indented(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _json_loads = orjson.loads
+
+except ImportError:
+    # Fallback if orjson isn't installed
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj)
+
+    def _json_dumps_indented(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+    _json_loads = json.loads
+
+
 try:
     from .utils import iso_utc_now
 except ImportError:
@@ -32,6 +61,15 @@ except ImportError:
 
 
 class IngestionIndexer:
+    # Number of chunks sent to the embedding endpoint per request
+    EMBED_BATCH_SIZE = 16
+    # Retries (with exponential backoff) for rate-limited embedding batches
+    EMBED_RATE_LIMIT_RETRIES = 3
+    # Documents per Azure Search upload request (service limit is 1000 / 16 MB)
+    SEARCH_UPLOAD_BATCH_SIZE = 500
+    # Upload requests sent to Azure Search concurrently
+    SEARCH_UPLOAD_CONCURRENCY = 4
+
     def __init__(
         self,
         *,
@@ -52,17 +90,52 @@ class IngestionIndexer:
         # Load configuration for metadata handling
         self.config = Config()
         self.file_name_field = "file_name"  # Default field for file names
+        # Filter fields copied from the metadata row onto every chunk; file_name
+        # is the row's lookup key rather than metadata, so it is left out
+        self._active_filter_fields = self._get_active_filter_fields()
         # Progress tracking
         self.progress_file = f"./progress_{self.search.index_name}.json"
+        # Background blob uploads that overlap with chunking and embedding
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="indexer-io"
+        )
 
     # --- CSV/Excel Metadata ---
+    def _get_active_filter_fields(self) -> tuple:
+        """Resolve the configured filter fields once, warning about empty ones"""
+        if not self.config.has_filters:
+            return ()
+
+        active_fields = []
+        for filter_name, filter_field in self.config.filters.items():
+            # Skip if filter_field is None or empty
+            if not filter_field:
+                logger.warning(
+                    f"[WARNING] [INDEXER] Skipping filter '{filter_name}' - field name is None or empty"
+                )
+                continue
+            # Skip file_name as it's a pointer/identifier, not metadata
+            if filter_field.lower() == "file_name":
+                continue
+            active_fields.append(filter_field)
+        return tuple(active_fields)
+
     def _read_metadata_file(self, content: bytes, filename: str) -> pd.DataFrame:
         """Read metadata from CSV or Excel file"""
         # Check file extension
         file_ext = filename.lower().split(".")[-1] if "." in filename else ""
 
         if file_ext in ["xlsx", "xls"]:
-            # Read Excel file
+            # Read Excel file, preferring the Rust-based calamine reader
+            try:
+                return pd.read_excel(BytesIO(content), engine="calamine")
+            except ImportError:
+                # python-calamine not installed, fall back to openpyxl
+                pass
+            except Exception as e:
+                logger.warning(
+                    f"[WARNING] [INDEXER] calamine could not read {filename}, retrying with openpyxl: {e}"
+                )
             try:
                 return pd.read_excel(BytesIO(content), engine="openpyxl")
             except ImportError:
@@ -73,65 +146,84 @@ class IngestionIndexer:
                 raise ValueError(f"Could not read Excel file: {str(e)}")
         else:
             # Read CSV file (default)
-            # Try common encodings in order of likelihood
-            for encoding in ["utf-8", "utf-8-sig", "latin1", "iso-8859-1", "cp1252"]:
+            # Try strict utf-8 first (utf-8-sig also strips a leading BOM), then
+            # the encoding detected on a sample, with latin1 as the last resort
+            encodings = ["utf-8-sig"]
+            detected = self._detect_encoding(content)
+            if detected and detected not in encodings:
+                encodings.append(detected)
+            encodings.append("latin1")
+            for encoding in encodings:
                 try:
-                    return pd.read_csv(StringIO(content.decode(encoding)))
+                    return pd.read_csv(
+                        BytesIO(content),
+                        encoding=encoding,
+                        engine="c",
+                        low_memory=False,
+                    )
                 except UnicodeDecodeError:
                     continue
             raise ValueError("Could not read CSV with common encodings")
 
+    @staticmethod
+    def _detect_encoding(content: bytes) -> Optional[str]:
+        """Guess the text encoding from the first 64 KiB of content"""
+        try:
+            from charset_normalizer import from_bytes
+        except ImportError:
+            return None
+
+        best = from_bytes(content[:65536]).best()
+        if best is None:
+            return None
+        if best.bom and best.encoding == "utf_8":
+            return "utf-8-sig"
+        return best.encoding
+
     def _create_base_metadata(
         self,
         chunk: str,
         page_num: int,
-        pdf_name: str,
+        cleaned_name: str,
+        file_uri: str,
         emb: List[float],
+        version_id: str,
         page_data: Dict = None,
-        version_id: str = None,
     ) -> Dict[str, Any]:
-        """Create base metadata structure that's common across all processing functions"""
+        """Create base metadata structure that's common across all processing functions
+
+        cleaned_name, file_uri and version_id are per-file values computed once
+        by the caller.
+        """
         now = iso_utc_now()
         page_data = page_data or {}
 
-        tables_data = page_data.get("tables", [])
-        tables_serialized = []
-        if tables_data and isinstance(tables_data, list):
-            for table in tables_data:
-                if isinstance(table, dict):
-                    # Serialize dict to JSON string
-                    tables_serialized.append(json.dumps(table))
-                elif isinstance(table, str):
-                    # Already a string
-                    tables_serialized.append(table)
-
-        # Create document using the SearchDocument model
         # Convert table dictionaries to JSON strings if they exist
-        tables = page_data.get("tables", [])
-        if tables and isinstance(tables[0], dict):
-            # Convert dict tables to JSON strings
-            tables = [json.dumps(table) for table in tables]
-
-        doc = SearchDocument(
-            id=uuid.uuid4().hex,
-            text=self.pdf.clean_text(chunk),
-            vector=emb.tolist(),
-            images=page_data.get("images", []),
-            charts=page_data.get("charts", []),
-            tables=tables,
-            page_number=int(page_num),
-            created_at=now,
-            updated_at=now,
-            file_name=self.pdf.clean_text(pdf_name),
-            file_uri=f"{self.container_url}/{self.storage.container_name}/{pdf_name}",
-            language="en",
-            uploaded_by=self.uploader_id,
-            access_level="public",
-            version_id=version_id or uuid.uuid4().hex,
-        )
-
-        # Convert to dict for further processing
-        doc_dict = doc.model_dump()
+        tables = [
+            _json_dumps(table) if isinstance(table, dict) else table
+            for table in (page_data.get("tables") or [])
+        ]
+
+        # Build the document dict directly; the keys mirror the SearchDocument
+        # model, which remains the schema contract for the index. This avoids
+        # validating and copying the embedding vector for every chunk
+        doc_dict = {
+            "id": f"{_CHUNK_ID_PREFIX}{next(_chunk_id_counter):016x}",
+            "text": self.pdf.clean_text(chunk),
+            "vector": emb if isinstance(emb, list) else emb.tolist(),
+            "images": list(page_data.get("images", [])),
+            "charts": list(page_data.get("charts", [])),
+            "tables": tables,
+            "page_number": int(page_num),
+            "created_at": now,
+            "updated_at": now,
+            "file_name": cleaned_name,
+            "file_uri": file_uri,
+            "language": "en",
+            "uploaded_by": self.uploader_id,
+            "access_level": "public",
+            "version_id": version_id,
+        }
 
         # Add chapter-based metadata if present in page_data
         if "section_number" in page_data:
@@ -156,18 +248,7 @@ class IngestionIndexer:
                 )
                 return base_doc
 
-            for filter_name, filter_field in self.config.filters.items():
-                # Skip if filter_field is None or empty
-                if not filter_field:
-                    logger.warning(
-                        f"[WARNING] [_add_csv_metadata] Skipping filter '{filter_name}' - field name is None or empty"
-                    )
-                    continue
-
-                # Skip file_name as it's a pointer/identifier, not metadata
-                if filter_field.lower() == "file_name":
-                    continue
-
+            for filter_field in self._active_filter_fields:
                 if filter_field in row:
                     try:
                         value = self.pdf.clean_text(str(row[filter_field]))
@@ -178,31 +259,59 @@ class IngestionIndexer:
                         )
                         base_doc[filter_field] = ""
                 else:
-                    logger.warning(
-                        f"[WARNING] [_add_csv_metadata] Filter field '{filter_field}' not found in CSV row"
-                    )
                     # Set default values for missing filter fields
                     base_doc[filter_field] = ""
-        else:
-            logger.info(
-                "[INFO] [_add_csv_metadata] Filters disabled - skipping CSV metadata"
-            )
 
         return base_doc
 
+    def _embed_batch(self, batch: List[tuple], section_label: str) -> List[List[float]]:
+        """
+        Embed a batch of (section_idx, section_num, section, chunk_idx, chunk)
+        items with one request.
+
+        A rate-limited (429) batch is retried with exponential backoff. Any other
+        failure falls back to embedding the chunks one by one, so only the
+        failing chunks are skipped (returned as None).
+        """
+        texts = [item[4] for item in batch]
+        for attempt in range(self.EMBED_RATE_LIMIT_RETRIES + 1):
+            try:
+                return list(self.llm.embed_batch(texts))
+            except Exception as e:
+                logger.warning(
+                    f"[WARNING] [INDEXER] Batch embedding of {len(texts)} chunks failed: {str(e)}"
+                )
+                if "429" not in str(e):
+                    break
+                if attempt == self.EMBED_RATE_LIMIT_RETRIES:
+                    raise
+                time.sleep(3 * 2**attempt)
+
+        embeddings = []
+        for _, section_num, _, chunk_idx, chunk in batch:
+            try:
+                embeddings.append(self.llm.embed(chunk))
+            except Exception as e:
+                logger.error(
+                    f"[ERROR] [INDEXER] {section_label.capitalize()} {section_num} chunk {chunk_idx}: Skipping due to embedding error: {str(e)}"
+                )
+                embeddings.append(None)
+        return embeddings
+
     # --- Public ops ---
     def create_or_update_index(self):
         return self.search.create_or_update_index()
 
     # --- Progress Tracking ---
+    # The progress file is replaced atomically on save, so readers always see
+    # a complete file and no cross-process lock is needed.
     def _load_progress(self) -> Dict[str, Any]:
         """Load processing progress from file"""
-        lock_path = self.progress_file + ".lock"
         try:
-            with FileLock(lock_path, timeout=5):
-                if os.path.exists(self.progress_file):
-                    with open(self.progress_file, "r") as f:
-                        return json.load(f)
+            with open(self.progress_file, "rb") as f:
+                return _json_loads(f.read())
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.error(f"Error loading progress file: {str(e)}")
 
@@ -216,22 +325,32 @@ class IngestionIndexer:
 
     def _save_progress(self, progress_data: Dict[str, Any]):
         """Save processing progress to file"""
-        lock_path = self.progress_file + ".lock"
+        temp_path = None
         try:
-            with FileLock(lock_path, timeout=5):
-                progress_data["last_update"] = datetime.utcnow().isoformat()
-                with open(self.progress_file, "w") as f:
-                    json.dump(progress_data, f, indent=2)
+            progress_data["last_update"] = datetime.now(timezone.utc).isoformat()
+            progress_dir = os.path.dirname(os.path.abspath(self.progress_file))
+            # Write to a unique temp file next to the target, then swap it in
+            with tempfile.NamedTemporaryFile(
+                "wb", dir=progress_dir, suffix=".tmp", delete=False
+            ) as f:
+                temp_path = f.name
+                f.write(_json_dumps_indented(progress_data))
+            os.replace(temp_path, self.progress_file)
         except Exception as e:
             logger.error(f"Error saving progress: {str(e)}")
+            # Don't leave a partial temp file behind
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
 
     def _clear_progress(self):
         """Clear progress file"""
-        lock_path = self.progress_file + ".lock"
         try:
-            with FileLock(lock_path, timeout=5):
-                if os.path.exists(self.progress_file):
-                    os.remove(self.progress_file)
+            os.remove(self.progress_file)
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.error(f"Error clearing progress file: {str(e)}")
 
@@ -280,22 +399,26 @@ class IngestionIndexer:
 
     def process_single_file_with_progress(
         self,
-        file_path: str,
+        file_path: Optional[str],
         filename: str,
         metadata_row: pd.Series = None,
         progress_callback=None,
         use_chapter_chunking: bool = False,
+        file_bytes: Optional[bytes] = None,
     ):
         """
         Process a single PDF or Word file with progress callbacks
 
         Args:
-            file_path: Local path to the PDF or Word file
+            file_path: Local path to the PDF or Word file. Not read when file_bytes is given.
             filename: Name to use for the file in the index
             metadata_row: Optional pandas Series containing metadata from CSV. Required when has_filters is True.
             progress_callback: Optional callback function that receives (progress_percentage, message)
             use_chapter_chunking: If True, use chapter-based chunking for Word documents (default: False)
+            file_bytes: Optional file content the caller already has in memory
         """
+        if file_path is None and file_bytes is None:
+            raise ValueError("Either file_path or file_bytes must be provided")
         try:
             # Determine file type
             file_extension = os.path.splitext(filename)[1].lower()
@@ -344,8 +467,12 @@ class IngestionIndexer:
                 except Exception as e:
                     logger.error(f"Error in progress callback: {e}")
 
-            with open(file_path, "rb") as f:
-                file_bytes = f.read()
+            # Map the file read-only instead of reading it into memory; the
+            # page cache then backs both the blob upload and the parsers.
+            # Content the caller already holds is used as-is.
+            if file_bytes is None:
+                with open(file_path, "rb") as f:
+                    file_bytes = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
             # Upload the actual PDF/Word file to blob storage with UUID prefix
             if progress_callback:
@@ -423,17 +550,22 @@ class IngestionIndexer:
                         file_bytes, report_dir
                     )
             else:
+                # PyMuPDF accepts a memoryview, so a mapping isn't copied
                 content_by_section, image_batches = self.pdf.iter_pdf(
-                    file_bytes, report_dir
+                    memoryview(file_bytes), report_dir
                 )
-            # Upload images to blob storage
+            # Upload images to blob storage in the background; they don't feed
+            # the embedding path, so chunking and embedding run meanwhile
+            image_upload = None
             if image_batches:
                 if progress_callback:
                     try:
                         progress_callback(40, f"Uploading images for: {filename}")
                     except Exception as e:
                         logger.error(f"Error in progress callback: {e}")
-                self.storage.upload_batch(image_batches)
+                image_upload = self._io_pool.submit(
+                    self.storage.upload_batch, image_batches
+                )
 
             # Create search documents
             if progress_callback:
@@ -443,72 +575,121 @@ class IngestionIndexer:
                     logger.error(f"Error in progress callback: {e}")
 
             docs: List[Dict[str, Any]] = []
-            total_sections = len(content_by_section)
-
-            for idx, (section_num, section) in enumerate(content_by_section.items()):
-                # Update progress for each section/page
-                section_progress = 60 + int((idx / total_sections) * 30)  # 60% to 90%
-                section_label = "section" if is_word_doc else "page"
-                if progress_callback:
-                    try:
-                        progress_callback(
-                            section_progress,
-                            f"Processing {section_label} {section_num} of {filename}",
-                        )
-                    except Exception as e:
-                        logger.error(f"Error in progress callback: {e}")
-
-                # Get text content - Word docs have text as list, PDFs as string
-                if isinstance(section.get("text"), list):
-                    text_content = "\n".join(section["text"])
-                else:
-                    text_content = section.get("text", "")
+            section_label = "section" if is_word_doc else "page"
+            # Per-file document fields, shared by every chunk
+            cleaned_name = self.pdf.clean_text(filename)
+            file_uri = f"{self.container_url}/{self.storage.container_name}/{filename}"
+            if self.config.has_filters and metadata_row is not None:
+                missing_fields = [
+                    field
+                    for field in self._active_filter_fields
+                    if field not in metadata_row
+                ]
+                if missing_fields:
+                    logger.warning(
+                        f"[WARNING] [INDEXER] Filter fields not found in CSV row for {filename}: {missing_fields}"
+                    )
 
-                # For chapter-based chunking, content is already chunked
-                if use_chapter_chunking and is_word_doc:
-                    chunks = [text_content]  # Already chunked, use as-is
-                else:
-                    chunks = processor.chunk_text(text_content, words_per_chunk=250)
+            # Gather the text of every section first. Word docs have text as a
+            # list of lines, PDFs as a string
+            sections = [
+                (section_num, section, section.get("text", ""))
+                for section_num, section in content_by_section.items()
+            ]
+
+            def chunk_section(text_content):
+                # Line lists are chunked directly, without joining them first
+                if isinstance(text_content, list):
+                    return self.word.chunk_text_lines(text_content, words_per_chunk=250)
+                return processor.chunk_text(text_content, words_per_chunk=250)
+
+            # For chapter-based chunking, content is already chunked; otherwise
+            # sections are chunked by a worker pool (map keeps section order)
+            if use_chapter_chunking and is_word_doc:
+                section_chunks = [[text_content] for _, _, text_content in sections]
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=self.config.indexer_workers
+                ) as executor:
+                    section_chunks = list(
+                        executor.map(lambda item: chunk_section(item[2]), sections)
+                    )
 
-                # TODO: Check if we can use batching for embeddings - asyncio.gather()
+            # Flatten into (section_idx, section_num, section, chunk_idx, chunk)
+            # items so embeddings can be requested in batches
+            pending_chunks = []
+            for idx, ((section_num, section, _), chunks) in enumerate(
+                zip(sections, section_chunks)
+            ):
+                # Drop empty chunks; isspace() avoids allocating a stripped copy
+                chunks = [c for c in chunks if c and not c.isspace()]
                 for chunk_idx, chunk in enumerate(chunks):
-                    if not chunk.strip():
-                        continue
+                    pending_chunks.append((idx, section_num, section, chunk_idx, chunk))
+
+            total_chunks = len(pending_chunks)
+            batches = [
+                pending_chunks[batch_start : batch_start + self.EMBED_BATCH_SIZE]
+                for batch_start in range(0, total_chunks, self.EMBED_BATCH_SIZE)
+            ]
+
+            # Embedding is network-bound, so several batches are requested
+            # concurrently; map() still yields results in batch order
+            with ThreadPoolExecutor(
+                max_workers=self.config.embedding_concurrency
+            ) as executor:
+                batch_embeddings = executor.map(
+                    lambda batch: self._embed_batch(batch, section_label), batches
+                )
+                embedded_count = 0
+                for batch, embeddings in zip(batches, batch_embeddings):
+                    embedded_count += len(batch)
+                    logger.info(
+                        f"[INFO] [INDEXER] Embedded {embedded_count} of {total_chunks} chunks"
+                    )
 
-                    # Generate embedding with retry
-                    try:
-                        emb = self.llm.embed(chunk)
-                        if chunk_idx == 0:  # Log first chunk of each section
-                            logger.info(
-                                f"[INFO] [INDEXER] {section_label.capitalize()} {section_num} chunk {chunk_idx}: Embedding generated successfully"
-                            )
-                    except Exception as e:
-                        logger.warning(
-                            f"[WARNING] [INDEXER] {section_label.capitalize()} {section_num} chunk {chunk_idx}: Embedding failed: {str(e)}"
-                        )
-                        if "429" in str(e):
-                            time.sleep(3)
-                            emb = self.llm.embed(chunk)
-                        else:
-                            logger.error(
-                                f"[ERROR] [INDEXER] {section_label.capitalize()} {section_num} chunk {chunk_idx}: Skipping due to embedding error"
+                    # Update progress for each embedded batch
+                    batch_progress = 60 + int(
+                        (embedded_count / total_chunks) * 30
+                    )  # 60% to 90%
+                    if progress_callback:
+                        try:
+                            progress_callback(
+                                batch_progress,
+                                f"Embedded {embedded_count} of {total_chunks} chunks for {filename}",
                             )
+                        except Exception as e:
+                            logger.error(f"Error in progress callback: {e}")
+
+                    for (idx, section_num, section, chunk_idx, chunk), emb in zip(
+                        batch, embeddings
+                    ):
+                        if emb is None:
                             continue
 
-                    # Create base metadata and add CSV metadata
-                    # For Word docs with chapter chunking, use sequential index instead of section_num for page_number
-                    page_num_value = (
-                        idx + 1
-                        if (use_chapter_chunking and is_word_doc)
-                        else section_num
-                    )
-                    base_doc = self._create_base_metadata(
-                        chunk, page_num_value, filename, emb, section, version_id
-                    )
+                        # Create base metadata and add CSV metadata
+                        # For Word docs with chapter chunking, use sequential index instead of section_num for page_number
+                        page_num_value = (
+                            idx + 1
+                            if (use_chapter_chunking and is_word_doc)
+                            else section_num
+                        )
+                        base_doc = self._create_base_metadata(
+                            chunk,
+                            page_num_value,
+                            cleaned_name,
+                            file_uri,
+                            emb,
+                            version_id,
+                            section,
+                        )
+
+                        complete_doc = self._add_csv_metadata(base_doc, metadata_row)
 
-                    complete_doc = self._add_csv_metadata(base_doc, metadata_row)
+                        docs.append(complete_doc)
 
-                    docs.append(complete_doc)
+            # Documents reference the images, so they must be stored first
+            if image_upload is not None:
+                image_upload.result()
 
             # Upload documents to search index
 
@@ -521,7 +702,30 @@ class IngestionIndexer:
                     except Exception as e:
                         logger.error(f"Error in progress callback: {e}")
 
-                self.search.upload_documents(docs)
+                # Upload in batches, several at a time, to overlap request latency
+                upload_batches = [
+                    docs[batch_start : batch_start + self.SEARCH_UPLOAD_BATCH_SIZE]
+                    for batch_start in range(
+                        0, len(docs), self.SEARCH_UPLOAD_BATCH_SIZE
+                    )
+                ]
+                with ThreadPoolExecutor(
+                    max_workers=self.SEARCH_UPLOAD_CONCURRENCY
+                ) as executor:
+                    uploaded_count = 0
+                    for batch, _ in zip(
+                        upload_batches,
+                        executor.map(self.search.upload_documents, upload_batches),
+                    ):
+                        uploaded_count += len(batch)
+                        if progress_callback:
+                            try:
+                                progress_callback(
+                                    90 + int((uploaded_count / len(docs)) * 9),
+                                    f"Uploaded {uploaded_count} of {len(docs)} documents for {filename}",
+                                )
+                            except Exception as e:
+                                logger.error(f"Error in progress callback: {e}")
 
             else:
                 logger.error(
@@ -546,3 +750,11 @@ class IngestionIndexer:
                 except Exception as cb_e:
                     logger.error(f"Error in progress callback: {cb_e}")
             raise
+        finally:
+            if isinstance(file_bytes, mmap.mmap):
+                try:
+                    file_bytes.close()
+                except BufferError:
+                    # A parser still holds a view of the mapping; it is
+                    # unmapped once that view is garbage collected
+                    pass
@@ -1,5 +1,9 @@
 # services/llm.py
-import numpy as np
+import functools
+import threading
+import time
+from typing import List
+
 from azure.identity import DefaultAzureCredential
 from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
 from llama_index.llms.azure_openai import AzureOpenAI
@@ -7,37 +11,90 @@ import config as Config
 
 config = Config.Config()
 
+COGNITIVE_SERVICES_SCOPE = "https://cognitiveservices.azure.com/.default"
+# Refresh the cached token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+
+
+def _cached_token_provider(credential):
+    """
+    Build an Azure AD token provider that caches the access token.
+
+    The OpenAI clients call the provider on every request, so the token is only
+    fetched again from the credential when it is about to expire.
+
+    Args:
+        credential: Azure credential used to fetch the token
+
+    Returns:
+        Zero-argument function returning the access token
+    """
+    cache = {"token": None, "expires_on": 0}
+    lock = threading.RLock()
+
+    def get_token_provider():
+        """Get Azure AD token for OpenAI access."""
+        with lock:
+            if cache["expires_on"] - TOKEN_REFRESH_MARGIN < time.time():
+                token = credential.get_token(COGNITIVE_SERVICES_SCOPE)
+                cache.update(token=token.token, expires_on=token.expires_on)
+            return cache["token"]
+
+    return get_token_provider
+
+
+@functools.lru_cache(maxsize=1)
+def _get_credential() -> DefaultAzureCredential:
+    """Shared managed identity credential (probing the credential chain is slow)."""
+    return DefaultAzureCredential()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_token_provider():
+    """Shared cached token provider for the Azure OpenAI clients."""
+    return _cached_token_provider(_get_credential())
+
+
+@functools.lru_cache(maxsize=1)
+def _get_llm() -> AzureOpenAI:
+    """Build the shared AzureOpenAI LLM client on first use."""
+    return AzureOpenAI(
+        model=config.llm_model_name,
+        deployment_name=config.azure_openai_deployment_name,
+        api_key="",  # Empty string to bypass key requirement
+        azure_ad_token_provider=_get_token_provider(),
+        azure_endpoint=config.azure_openai_endpoint,
+        api_version=config.azure_openai_api_version,
+        temperature=0.0,
+        max_tokens=2000,
+        use_azure_ad=True,  # Ensure Managed Identity is used
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_embed_model() -> AzureOpenAIEmbedding:
+    """Build the shared AzureOpenAIEmbedding client on first use."""
+    return AzureOpenAIEmbedding(
+        model=config.embedding_model_name,
+        deployment_name=config.azure_openai_embedding_deployment,
+        api_key="",  # Empty string to bypass key requirement
+        azure_ad_token_provider=_get_token_provider(),
+        azure_endpoint=config.azure_openai_endpoint,
+        api_version=config.azure_openai_api_version,
+        dimensions=3072,  # Explicitly set dimensions
+    )
+
 
 class LLMClient:
     def __init__(self):
         """
         Initialize the LLM client with Azure OpenAI using Managed Identity authentication.
 
-        Args:
-            endpoint: Azure OpenAI endpoint
-            deployment_name: Name of the deployment
-            api_version: API version to use
+        The underlying client (and its credential) is built once per process and
+        shared by every LLMClient instance.
         """
         # Use managed identity authentication only
-        credential = DefaultAzureCredential()
-
-        # Create a token provider function that returns the access token
-        def get_token_provider():
-            """Get Azure AD token for OpenAI access."""
-            token = credential.get_token("https://cognitiveservices.azure.com/.default")
-            return token.token
-
-        self._client = AzureOpenAI(
-            model=config.llm_model_name,
-            deployment_name=config.azure_openai_deployment_name,
-            api_key="",  # Empty string to bypass key requirement
-            azure_ad_token_provider=get_token_provider,
-            azure_endpoint=config.azure_openai_endpoint,
-            api_version=config.azure_openai_api_version,
-            temperature=0.0,
-            max_tokens=2000,
-            use_azure_ad=True,  # Ensure Managed Identity is used
-        )
+        self._client = _get_llm()
 
 
 class EmbeddingClient:
@@ -45,37 +102,23 @@ class EmbeddingClient:
         self,
     ):
         """
-        Initialize the LLM client with Azure OpenAI using Managed Identity authentication.
+        Initialize the embedding client with Azure OpenAI using Managed Identity authentication.
 
-        Args:
-            endpoint: Azure OpenAI endpoint
-            deployment_name: Name of the deployment
-            api_version: API version to use
+        The underlying client (and its credential) is built once per process and
+        shared by every EmbeddingClient instance.
         """
         # Use managed identity authentication only
-        credential = DefaultAzureCredential()
-
-        # Create a token provider function that returns the access token
-        def get_token_provider():
-            """Get Azure AD token for OpenAI access."""
-            token = credential.get_token("https://cognitiveservices.azure.com/.default")
-            return token.token
-
-        self.embed_model = AzureOpenAIEmbedding(
-            model=config.embedding_model_name,
-            deployment_name=config.azure_openai_embedding_deployment,
-            api_key="",  # Empty string to bypass key requirement
-            azure_ad_token_provider=get_token_provider,
-            azure_endpoint=config.azure_openai_endpoint,
-            api_version=config.azure_openai_api_version,
-            dimensions=3072,  # Explicitly set dimensions
-        )
+        self.embed_model = _get_embed_model()
 
         # Alias for compatibility
         self._client = self.embed_model
 
-    def embed(self, text: str) -> np.ndarray:
+    def embed(self, text: str) -> List[float]:
         """Generate embedding for text using LlamaIndex AzureOpenAIEmbedding."""
-        # LlamaIndex's get_text_embedding returns a list of floats
-        embedding = self.embed_model.get_text_embedding(text)
-        return np.array(embedding)
+        # LlamaIndex's get_text_embedding returns a list of floats, which is
+        # also what the search index expects, so it is returned as-is
+        return self.embed_model.get_text_embedding(text)
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in a single request."""
+        return self.embed_model.get_text_embedding_batch(texts, show_progress=False)
@@ -6,16 +6,145 @@ with short-term and long-term memory blocks. It integrates with the chat history
 service to retrieve and maintain conversation context for improved RAG responses.
 """
 
+import functools
+import itertools
 import logging
-from typing import Optional, List, Dict, Any
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterator
+import tiktoken
+from llama_index.core.bridge.pydantic import PrivateAttr
 from llama_index.core.memory import Memory
-from llama_index.core.llms import ChatMessage, MessageRole
-from model import ChatHistoryQuery
+from llama_index.core.llms import ChatMessage, MessageRole, TextBlock
+from llama_index.core.storage.chat_store.sql import MessageStatus, SQLAlchemyChatStore
 
 logger = logging.getLogger(__name__)
 BACKEND_EXCEPTION_TAG = "BACKEND_EXCEPTION"
 
 
+def _load_encoder() -> Optional[tiktoken.Encoding]:
+    """Load and warm the tokenizer for the configured LLM, shared by all sessions."""
+    try:
+        try:
+            encoder = tiktoken.encoding_for_model(os.getenv("LLM_MODEL_NAME", "gpt-4o"))
+        except KeyError:
+            encoder = tiktoken.get_encoding("cl100k_base")
+        # The first encode call is noticeably slower; pay it at import time
+        encoder.encode("warmup")
+        return encoder
+    except Exception as e:
+        logger.warning("[WARNING] [MEMORY] Could not load tiktoken encoder: %s", e)
+        return None
+
+
+_ENCODER = _load_encoder()
+# Chat text may contain special-token strings such as "<|endoftext|>"; encode
+# them as ordinary text (like LlamaIndex's default tokenizer) instead of raising
+_TOKENIZER = (
+    functools.partial(_ENCODER.encode, allowed_special="all") if _ENCODER else None
+)
+
+
+class _SessionCache:
+    """
+    Session-keyed cache bounded by size (LRU) and idle time (TTL).
+
+    Entries untouched for longer than session_ttl seconds are dropped on access,
+    and the least recently used entry is evicted once max_sessions is exceeded.
+    Not thread-safe on its own; MemoryManager guards it with a lock.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_sessions: int, session_ttl: float):
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        # session_id -> (last access time, value), least recently used first
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        entry = self._data.get(session_id)
+        if entry is None:
+            return default
+        now = time.monotonic()
+        if now - entry[0] > self.session_ttl:
+            del self._data[session_id]
+            return default
+        self._data[session_id] = (now, entry[1])
+        self._data.move_to_end(session_id)
+        return entry[1]
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id, self._MISSING) is not self._MISSING
+
+    def __setitem__(self, session_id: str, value: Any) -> None:
+        self._data[session_id] = (time.monotonic(), value)
+        self._data.move_to_end(session_id)
+        while len(self._data) > self.max_sessions:
+            self._data.popitem(last=False)
+
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        entry = self._data.pop(session_id, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _TokenCountingMemory(Memory):
+    """
+    Memory that keeps a running token count of its active chat queue.
+
+    The base class re-counts every active message after each put to decide
+    whether to flush to long-term memory. Here only the new messages are
+    counted, and the full flush pass runs once the total crosses the limit.
+    """
+
+    _active_tokens: int = PrivateAttr(default=0)
+
+    async def _count_new_messages(self, messages: List[ChatMessage]) -> None:
+        self._active_tokens += sum(
+            self._estimate_token_count(message) for message in messages
+        )
+        if self._active_tokens > self.token_limit * self.chat_history_token_ratio:
+            await self._manage_queue()
+            await self._recount_active_tokens()
+
+    async def _recount_active_tokens(self) -> None:
+        active = await self.sql_store.get_messages(
+            self.session_id, status=MessageStatus.ACTIVE
+        )
+        self._active_tokens = sum(
+            self._estimate_token_count(message) for message in active
+        )
+
+    async def aput(self, message: ChatMessage) -> None:
+        await self.sql_store.add_message(
+            self.session_id, message, status=MessageStatus.ACTIVE
+        )
+        await self._count_new_messages([message])
+
+    async def aput_messages(self, messages: List[ChatMessage]) -> None:
+        await self.sql_store.add_messages(
+            self.session_id, messages, status=MessageStatus.ACTIVE
+        )
+        await self._count_new_messages(messages)
+
+    async def aset(self, messages: List[ChatMessage]) -> None:
+        await super().aset(messages)
+        await self._recount_active_tokens()
+
+    async def areset(self, status: Optional[MessageStatus] = None) -> None:
+        await super().areset(status=status)
+        await self._recount_active_tokens()
+
+
 class MemoryManager:
     """
     Manages chat memory for RAG conversations using LlamaIndex Memory.
@@ -28,12 +157,21 @@ class MemoryManager:
     - Storing references and images metadata for each interaction
     """
 
+    # Concurrent history requests made by prefetch_sessions
+    PREFETCH_CONCURRENCY = 4
+    # Messages requested per history page, and the most loaded per session
+    HISTORY_PAGE_SIZE = 50
+    HISTORY_MAX_MESSAGES = 1000
+
     def __init__(
         self,
         chat_history_service=None,
         token_limit: int = 100000,
         chat_history_token_ratio: float = 0.7,
         token_flush_size: int = 5000,
+        max_sessions: int = 5000,
+        session_ttl: float = 28 * 86400,
+        metadata_retention: int = 100,
     ):
         """
         Initialize the Memory Manager.
@@ -43,17 +181,61 @@ class MemoryManager:
             token_limit: Maximum number of tokens to store in memory (default: 100000)
             chat_history_token_ratio: Ratio of tokens allocated to short-term chat history (default: 0.7)
             token_flush_size: Number of tokens to flush at once to long-term memory (default: 5000)
+            max_sessions: Maximum number of sessions kept in memory (default: 5000)
+            session_ttl: Seconds an idle session stays cached (default: 28 days)
+            metadata_retention: Most recent interactions whose metadata is kept per session (default: 100)
         """
         self.chat_history_service = chat_history_service
         self.token_limit = token_limit
         self.chat_history_token_ratio = chat_history_token_ratio
         self.token_flush_size = token_flush_size
+        self.metadata_retention = metadata_retention
 
+        # Evicted sessions are reloaded from Cosmos DB on their next request,
+        # so both caches can be bounded without losing history
         # Cache for memory instances by session_id
-        self._memory_cache: Dict[str, Memory] = {}
-
-        # Cache for references and images metadata by session_id
-        self._metadata_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._memory_cache = _SessionCache(max_sessions, session_ttl)
+
+        # Cache for references and images metadata by session_id; each entry is
+        # a deque that drops its oldest interaction once metadata_retention is hit
+        self._metadata_cache = _SessionCache(max_sessions, session_ttl)
+
+        # Guards both caches; requests are served from several threads
+        self._cache_lock = threading.RLock()
+
+        # One lock per session being loaded (created under _cache_lock), so
+        # concurrent requests for an uncached session fetch its history once
+        self._session_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+        # Every session's Memory has the same settings, so one validated
+        # prototype is built here and copied for each new session
+        self._memory_prototype = self._build_memory_prototype()
+
+    def _build_memory_prototype(self) -> Memory:
+        """Build the Memory that new sessions are copied from."""
+        return _TokenCountingMemory.from_defaults(
+            session_id="__prototype__",
+            token_limit=self.token_limit,
+            chat_history_token_ratio=self.chat_history_token_ratio,
+            token_flush_size=self.token_flush_size,
+            insert_method="user",  # Insert memory blocks into user messages
+            # Falls back to LlamaIndex's default tokenizer if tiktoken failed
+            tokenizer_fn=_TOKENIZER,
+        )
+
+    def _create_memory(self, SessionID: str) -> Memory:
+        """Create an empty Memory instance for a session."""
+        # A shallow copy skips model validation; each session still gets its
+        # own chat store and memory block list
+        return self._memory_prototype.model_copy(
+            update={
+                "session_id": SessionID,
+                "sql_store": SQLAlchemyChatStore(
+                    table_name=self._memory_prototype.sql_store.table_name,
+                ),
+                "memory_blocks": [],
+            }
+        )
 
     def get_memory_for_session(self, SessionID: str, UserID: str, BotID: str) -> Memory:
         """
@@ -71,140 +253,195 @@ class MemoryManager:
         """
         try:
             # Check if we already have memory for this session
-            if SessionID in self._memory_cache:
-                cached_memory = self._memory_cache[SessionID]
+            with self._cache_lock:
+                cached_memory = self._memory_cache.get(SessionID)
+                if cached_memory is None:
+                    session_lock = self._session_locks[SessionID]
+            if cached_memory is not None:
                 return cached_memory
 
-            # Create new Memory instance for this session
-            memory = Memory.from_defaults(
+            try:
+                with session_lock:
+                    # Another request may have loaded it while we waited
+                    with self._cache_lock:
+                        cached_memory = self._memory_cache.get(SessionID)
+                    if cached_memory is not None:
+                        return cached_memory
+                    return self._load_session_memory(SessionID, UserID, BotID)
+            finally:
+                with self._cache_lock:
+                    if self._session_locks.get(SessionID) is session_lock:
+                        del self._session_locks[SessionID]
+
+        except Exception as e:
+            logger.exception(
+                "[ERROR] [MEMORY] Error getting memory for session %s: %s", SessionID, e
+            )
+            # Return empty memory as fallback
+            return Memory.from_defaults(
                 session_id=SessionID,
                 token_limit=self.token_limit,
                 chat_history_token_ratio=self.chat_history_token_ratio,
                 token_flush_size=self.token_flush_size,
-                insert_method="user",  # Insert memory blocks into user messages
             )
 
-            # Load conversation history from Cosmos DB if service is available
-            if self.chat_history_service:
-                chat_messages, metadata_list = self._retrieve_session_history(
-                    SessionID, UserID, BotID
-                )
-
+    def _load_session_memory(self, SessionID: str, UserID: str, BotID: str) -> Memory:
+        """Create a session's Memory, load its history and cache both."""
+        # Create new Memory instance for this session
+        memory = self._create_memory(SessionID)
+
+        # Load conversation history from Cosmos DB if service is available
+        metadata_list = deque(maxlen=self.metadata_retention)
+        if self.chat_history_service:
+            for chat_messages, page_metadata in self._retrieve_session_history(
+                SessionID, UserID, BotID
+            ):
                 if chat_messages:
-                    # Use put_messages to add all messages at once
+                    # Insert page by page so memory can flush between pages
                     memory.put_messages(chat_messages)
+                metadata_list.extend(page_metadata)
+        else:
+            logger.warning(
+                "%s memory.service_unavailable session_id=%s",
+                BACKEND_EXCEPTION_TAG,
+                SessionID,
+            )
 
-                    # Store metadata cache
-                    self._metadata_cache[SessionID] = metadata_list
-                else:
-                    self._metadata_cache[SessionID] = []
-            else:
-                logger.warning(
-                    "%s memory.service_unavailable session_id=%s",
-                    BACKEND_EXCEPTION_TAG,
-                    SessionID,
-                )
-                self._metadata_cache[SessionID] = []
-
-            # Cache the memory instance
+        # Cache the memory instance and its metadata
+        with self._cache_lock:
+            self._metadata_cache[SessionID] = metadata_list
             self._memory_cache[SessionID] = memory
-            return memory
+        return memory
 
-        except Exception as e:
-            logger.error(
-                f"[ERROR] [MEMORY] Error getting memory for session {SessionID}: {e}"
-            )
-            logger.exception("Full exception details:")
-            # Return empty memory as fallback
-            return Memory.from_defaults(
-                session_id=SessionID,
-                token_limit=self.token_limit,
-                chat_history_token_ratio=self.chat_history_token_ratio,
-                token_flush_size=self.token_flush_size,
+    def prefetch_sessions(self, session_ids: List[str], UserID: str, BotID: str) -> int:
+        """
+        Load the history of several sessions into the cache in one call.
+
+        Meant to run when a user's session list is fetched, so the session they
+        open next is already cached. Sessions that are cached already are
+        skipped and the rest are fetched concurrently.
+
+        Args:
+            session_ids: Session identifiers to load
+            UserID: User identifier
+            BotID: Bot identifier
+
+        Returns:
+            Number of sessions that were fetched
+        """
+        if not self.chat_history_service:
+            return 0
+
+        with self._cache_lock:
+            missing = [
+                session_id
+                for session_id in dict.fromkeys(session_ids)
+                if session_id not in self._memory_cache
+            ]
+        if not missing:
+            return 0
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.PREFETCH_CONCURRENCY, len(missing))
+        ) as executor:
+            list(
+                executor.map(
+                    lambda session_id: self.get_memory_for_session(
+                        session_id, UserID, BotID
+                    ),
+                    missing,
+                )
             )
+        return len(missing)
 
     def _retrieve_session_history(
-        self, session_id: str, user_id: str, bot_id: str, limit: int = 50
-    ) -> tuple[List[ChatMessage], List[Dict[str, Any]]]:
+        self,
+        session_id: str,
+        user_id: str,
+        bot_id: str,
+        limit: int = HISTORY_PAGE_SIZE,
+    ) -> Iterator[tuple[List[ChatMessage], List[Dict[str, Any]]]]:
         """
         Retrieve conversation history from Cosmos DB and convert to ChatMessage format.
         Also extracts references and images metadata.
 
+        History is fetched one page at a time, so only a single page of raw
+        messages is held while it is converted.
+
         Args:
             session_id: Session identifier
             user_id: User identifier
             bot_id: Bot identifier
-            limit: Maximum number of messages to retrieve
+            limit: Number of messages to fetch per page
 
-        Returns:
+        Yields:
             Tuple of (List of ChatMessage objects, List of metadata dicts with references and images)
+            for each page of history
         """
         try:
-            # Query chat history service
-            query = ChatHistoryQuery(
-                BotID=bot_id,
-                UserID=user_id,
-                SessionID=session_id,
-                limit=limit,
-            )
-
-            # Call get_user_session with individual arguments instead of query object
-            result = self.chat_history_service.get_user_session(
-                UserID=query.UserID, SessionID=query.SessionID, BotID=query.BotID
-            )
-
-            if not result.get("success"):
-                logger.warning(
-                    "%s memory.history_fetch_failed session_id=%s error=%s",
-                    BACKEND_EXCEPTION_TAG,
-                    session_id,
-                    result.get("error"),
+            offset = 0
+            while offset < self.HISTORY_MAX_MESSAGES:
+                # Query chat history service
+                result = self.chat_history_service.get_user_session(
+                    UserID=user_id,
+                    SessionID=session_id,
+                    BotID=bot_id,
+                    limit=min(limit, self.HISTORY_MAX_MESSAGES - offset),
+                    offset=offset,
                 )
-                return [], []
-
-            # Extract messages from result
-            history_data = result.get("data", {})
-            messages = history_data.get("messages", [])
-
-            if not messages:
-                return [], []
-
-            # Convert to ChatMessage format and extract metadata
-            chat_messages = []
-            metadata_list = []
-            for msg in messages:
-                # Add user message
-                user_content = msg.get("query", "")
-                if user_content:
-                    chat_messages.append(
-                        ChatMessage(role=MessageRole.USER, content=user_content)
-                    )
 
-                # Add assistant response
-                assistant_content = msg.get("response", "")
-                if assistant_content:
-                    chat_messages.append(
-                        ChatMessage(
-                            role=MessageRole.ASSISTANT, content=assistant_content
+                if not result.get("success"):
+                    logger.warning(
+                        "%s memory.history_fetch_failed session_id=%s error=%s",
+                        BACKEND_EXCEPTION_TAG,
+                        session_id,
+                        result.get("error"),
+                    )
+                    return
+
+                # Extract messages from result
+                history_data = result.get("data", {})
+                messages = history_data.get("messages", [])
+
+                if not messages:
+                    return
+
+                # Convert to ChatMessage format, a user and an assistant message
+                # per interaction with empty sides skipped. Blocks are passed
+                # directly, which skips ChatMessage's content conversion
+                chat_messages = [
+                    ChatMessage(role=role, blocks=[TextBlock(text=content)])
+                    for role, content in itertools.chain.from_iterable(
+                        (
+                            (MessageRole.USER, msg.get("query", "")),
+                            (MessageRole.ASSISTANT, msg.get("response", "")),
                         )
+                        for msg in messages
                     )
+                    if content
+                ]
 
                 # Extract metadata (references and images)
-                interaction_metadata = {
-                    "query": user_content,
-                    "response": assistant_content,
-                    "references": msg.get("references", []),
-                    "images": msg.get("images", []),
-                    "timestamp": msg.get("timestamp"),
-                }
-                metadata_list.append(interaction_metadata)
-
-            return chat_messages, metadata_list
+                metadata_list = [
+                    {
+                        "query": msg.get("query", ""),
+                        "response": msg.get("response", ""),
+                        "references": msg.get("references", []),
+                        "images": msg.get("images", []),
+                        "timestamp": msg.get("timestamp"),
+                    }
+                    for msg in messages
+                ]
+
+                yield chat_messages, metadata_list
+
+                # A short page means the service has nothing more to return
+                if not history_data.get("has_more") or len(messages) < limit:
+                    return
+                offset += len(messages)
 
         except Exception as e:
-            logger.error(f"[ERROR] [MEMORY] Error retrieving session history: {e}")
-            logger.exception("Full exception details:")
-            return [], []
+            logger.exception("[ERROR] [MEMORY] Error retrieving session history: %s", e)
 
     def add_interaction(
         self,
@@ -230,19 +467,20 @@ class MemoryManager:
         """
         try:
             # Get or create memory for this session
-            if SessionID not in self._memory_cache:
-                # Create memory without loading from Cosmos (we're adding the current interaction)
-                memory = Memory.from_defaults(
-                    session_id=SessionID,
-                    token_limit=self.token_limit,
-                    chat_history_token_ratio=self.chat_history_token_ratio,
-                    token_flush_size=self.token_flush_size,
-                    insert_method="user",
-                )
-                self._memory_cache[SessionID] = memory
-                self._metadata_cache[SessionID] = []
-            else:
-                memory = self._memory_cache[SessionID]
+            with self._cache_lock:
+                memory = self._memory_cache.get(SessionID)
+                if memory is None:
+                    # Create memory without loading from Cosmos (we're adding the current interaction)
+                    memory = self._create_memory(SessionID)
+                    self._memory_cache[SessionID] = memory
+                    self._metadata_cache[SessionID] = deque(
+                        maxlen=self.metadata_retention
+                    )
+
+                metadata_list = self._metadata_cache.get(SessionID)
+                if metadata_list is None:
+                    metadata_list = deque(maxlen=self.metadata_retention)
+                    self._metadata_cache[SessionID] = metadata_list
 
             # Add messages to memory
             messages = [
@@ -253,10 +491,7 @@ class MemoryManager:
             memory.put_messages(messages)
 
             # Store metadata
-            if SessionID not in self._metadata_cache:
-                self._metadata_cache[SessionID] = []
-
-            self._metadata_cache[SessionID].append(
+            metadata_list.append(
                 {
                     "user_id": UserID,
                     "bot_id": BotID,
@@ -268,8 +503,7 @@ class MemoryManager:
             )
 
         except Exception as e:
-            logger.error(f"[ERROR] [MEMORY] Error adding interaction: {e}")
-            logger.exception("Full add_interaction exception:")
+            logger.exception("[ERROR] [MEMORY] Error adding interaction: %s", e)
 
     def get_references_and_images(self, session_id: str) -> List[Dict[str, Any]]:
         """
@@ -279,9 +513,10 @@ class MemoryManager:
             session_id: Session identifier
 
         Returns:
-            List of metadata dicts containing references and images
+            List of metadata dicts containing references and images, oldest first
         """
-        return self._metadata_cache.get(session_id, [])
+        with self._cache_lock:
+            return list(self._metadata_cache.get(session_id, ()))
 
     def get_conversation_context(self, session_id: str) -> List[ChatMessage]:
         """
@@ -294,19 +529,23 @@ class MemoryManager:
             List of ChatMessage objects representing the conversation context
         """
         try:
-            if session_id in self._memory_cache:
-                memory = self._memory_cache[session_id]
+            with self._cache_lock:
+                memory = self._memory_cache.get(session_id)
+            if memory is not None:
                 chat_history = memory.get()
                 logger.debug(
-                    f"[DEBUG] [MEMORY] Retrieved {len(chat_history)} messages from memory"
+                    "[DEBUG] [MEMORY] Retrieved %d messages from memory",
+                    len(chat_history),
                 )
                 return chat_history
             else:
-                logger.debug(f"[DEBUG] [MEMORY] No memory cached for session: {session_id}")
+                logger.debug(
+                    "[DEBUG] [MEMORY] No memory cached for session: %s", session_id
+                )
                 return []
 
         except Exception as e:
-            logger.error(f"[ERROR] [MEMORY] Error getting conversation context: {e}")
+            logger.error("[ERROR] [MEMORY] Error getting conversation context: %s", e)
             return []
 
     def clear_session_memory(self, session_id: str) -> None:
@@ -316,13 +555,12 @@ class MemoryManager:
         Args:
             session_id: Session identifier
         """
-        if session_id in self._memory_cache:
-            del self._memory_cache[session_id]
-
-        if session_id in self._metadata_cache:
-            del self._metadata_cache[session_id]
+        with self._cache_lock:
+            self._memory_cache.pop(session_id)
+            self._metadata_cache.pop(session_id)
 
     def clear_all_memory(self) -> None:
         """Clear all cached memory instances and metadata."""
-        self._memory_cache.clear()
-        self._metadata_cache.clear()
+        with self._cache_lock:
+            self._memory_cache.clear()
+            self._metadata_cache.clear()
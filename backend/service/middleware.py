@@ -5,7 +5,11 @@ This middleware handles JWT authentication for all protected endpoints,
 extracting and validating JWT tokens from the Authorization header.
 """
 
+import hashlib
 import logging
+import re
+import threading
+import time
 from typing import Dict, Any, Optional, List
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
@@ -14,6 +18,39 @@ from model.apis import UserRole
 
 logger = logging.getLogger(__name__)
 
+# Role bits; a role's mask also carries the bits of every role below it
+_USER_BIT = 1
+_ADMIN_BIT = 2
+_SUPER_ADMIN_BIT = 4
+_ROLE_MASKS = {
+    UserRole.USER.value: _USER_BIT,
+    UserRole.ADMIN.value: _ADMIN_BIT | _USER_BIT,
+    UserRole.SUPER_ADMIN.value: _SUPER_ADMIN_BIT | _ADMIN_BIT | _USER_BIT,
+}
+# Role buckets from highest to lowest; the highest matching bucket applies
+_BUCKET_PRECEDENCE = ("super_admin", "admin", "user")
+# Role bit required by each path bucket, with the error shown when it is missing
+_BUCKET_REQUIREMENTS = {
+    "super_admin": (_SUPER_ADMIN_BIT, "Super Admin access required"),
+    "admin": (_ADMIN_BIT, "Admin access required"),
+    "user": (_USER_BIT, "User access required"),
+    None: (_USER_BIT, "Authentication required"),
+}
+
+
+def _role_mask(roles: frozenset) -> int:
+    """Combine the bits of all recognised roles in a role set."""
+    mask = 0
+    for role in roles:
+        mask |= _ROLE_MASKS.get(role, 0)
+    return mask
+
+
+def _route_pattern(prefix: str) -> str:
+    """Regex for a route prefix in which each "{param}" matches one path segment."""
+    literals = re.split(r"\{[^/}]*\}", prefix)
+    return "[^/]+".join(re.escape(literal) for literal in literals)
+
 
 class JWTAuthMiddleware(BaseHTTPMiddleware):
     """
@@ -27,6 +64,11 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
     5. Handles role-based access control
     """
 
+    # Validated tokens are cached (by hash) for at most this many seconds,
+    # and never past the token's own expiry
+    TOKEN_CACHE_TTL = 60
+    TOKEN_CACHE_SIZE = 10_000
+
     def __init__(
         self, app, jwt_service=None, excluded_paths: Optional[List[str]] = None
     ):
@@ -62,36 +104,48 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
             "/v1/public_session",  # Public session endpoint (no auth required)
         ]
 
-        # User: Endpoints accessible by users, admins, and super admins
-        self.user_paths = [
-            "/v1/query",
-            "/v1/status/",
-            "/v1/chat/history",
-            "/v1/chat/feedback",
-            "/v1/chat/export",
-            "/v1/session/",
-            "/v1/ws/",
-            "/v1/sessions/titles",
-            "/v1/get-pdf/",
+        # Role routes: (HTTP method, path prefix, role bucket). A method of None
+        # applies to every method, and "{param}" matches one path segment.
+        # When several routes match, super admin wins over admin over user.
+        self.role_routes = [
+            # User: Endpoints accessible by users, admins, and super admins
+            (None, "/v1/query", "user"),
+            (None, "/v1/status/", "user"),
+            (None, "/v1/chat/history", "user"),
+            (None, "/v1/chat/feedback", "user"),
+            (None, "/v1/chat/export", "user"),
+            (None, "/v1/session/", "user"),
+            (None, "/v1/ws/", "user"),
+            (None, "/v1/sessions/titles", "user"),
+            (None, "/v1/get-pdf/", "user"),
+            # Admin: Endpoints accessible by admins and super admins only
+            (None, "/v1/upload", "admin"),
+            (None, "/v1/botids/", "admin"),
+            ("DELETE", "/v1/files/", "admin"),
+            (None, "/v1/bots/{bot_id}/statistics", "admin"),
+            # Super Admin: Endpoints accessible by super admins only
+            (None, "/v1/updateconfig", "super_admin"),
+            ("DELETE", "/v1/reset-factory-new", "super_admin"),
         ]
 
-        # Admin: Endpoints accessible by admins and super admins only
-        self.admin_paths = [
-            "/v1/upload",
-            "/v1/botids/",
-            "/v1/files/",  # DELETE operations
-            "/v1/bots/{bot_id}/statistics",
-        ]
+        # Excluded and no-auth paths are both public prefixes, so they are merged
+        # (without duplicates) into one tuple for a single str.startswith call.
+        # Exact public paths (health and config probes above all) are caught
+        # first by a set lookup
+        public_paths = list(dict.fromkeys(self.excluded_paths + self.no_auth_paths))
+        self._public_set = frozenset(public_paths)
+        self._public_prefixes = tuple(public_paths)
 
-        # Super Admin: Endpoints accessible by super admins only
-        self.super_admin_paths = [
-            "/v1/updateconfig"
-            # Add super admin exclusive endpoints here
-            # Example: "/v1/admin/users", "/v1/admin/system"
-        ]
+        # token hash -> (monotonic expiry, user_info) for recently validated tokens
+        self._token_cache: Dict[str, tuple] = {}
+        self._token_cache_lock = threading.Lock()
+
+        # HTTP method -> role matcher, built from role_routes on first use
+        self._role_matchers: Dict[str, tuple] = {}
 
         logger.info(
-            f"JWT Auth Middleware initialized with {len(self.excluded_paths)} excluded paths"
+            "JWT Auth Middleware initialized with %d excluded paths",
+            len(self.excluded_paths),
         )
 
     async def dispatch(self, request: Request, call_next):
@@ -106,11 +160,11 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
             Response from the next middleware/endpoint or error response
         """
 
+        path = request.url.path
+
         # Check if path is excluded from authentication (NoAuth)
-        if self._is_excluded_path(request.url.path) or self._is_no_auth_path(
-            request.url.path
-        ):
-            logger.debug(f"Skipping auth for public path: {request.url.path}")
+        if path in self._public_set or path.startswith(self._public_prefixes):
+            logger.debug("Skipping auth for public path: %s", path)
             return await call_next(request)
 
         try:
@@ -118,13 +172,14 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
             user_info = await self._authenticate_request(request)
 
             # Check role-based access
-            self._check_role_access(request.url.path, request.method, user_info)
+            self._check_role_access(path, request.method, user_info)
 
             # Add user info to request state for endpoints to access
             request.state.current_user = user_info
 
             logger.debug(
-                f"Authentication successful for user: {user_info.get('username', 'unknown')}"
+                "Authentication successful for user: %s",
+                user_info.get("username", "unknown"),
             )
 
             # Continue to the next middleware/endpoint
@@ -132,41 +187,99 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
             return response
 
         except HTTPException as e:
-            logger.warning(f"Authentication failed for {request.url.path}: {e.detail}")
+            logger.warning("Authentication failed for %s: %s", path, e.detail)
             return JSONResponse(
                 status_code=e.status_code,
                 content={"error": e.detail, "status_code": e.status_code},
             )
         except Exception as e:
-            logger.error(f"Unexpected error in auth middleware: {str(e)}")
+            logger.exception("Unexpected error in auth middleware: %s", e)
             return JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={"error": "Internal server error", "status_code": 500},
             )
 
-    def _is_excluded_path(self, path: str) -> bool:
+    def _build_role_matcher(self, method: str) -> tuple:
         """
-        Check if the request path is excluded from authentication
+        Compile the role routes that apply to one HTTP method
+
+        Most role prefixes are a plain "/v1/<name>" route, so the bucket is
+        usually found with one lookup of the path's two-segment route key
+        ("/v1/query", "/v1/status/"). Prefixes that are not whole routes, or
+        that hold a "{param}", go into one regex of alternatives ordered from
+        super admin down, and keys such a prefix could also match are left
+        out of the table.
 
         Args:
-            path: Request URL path
+            method: HTTP method
 
         Returns:
-            True if path is excluded, False otherwise
+            Tuple of (route key table, regex, bucket of each regex group)
         """
-        return any(path.startswith(excluded) for excluded in self.excluded_paths)
+        routes = sorted(
+            (
+                (prefix, bucket)
+                for route_method, prefix, bucket in self.role_routes
+                if route_method is None or route_method == method
+            ),
+            key=lambda route: _BUCKET_PRECEDENCE.index(route[1]),
+        )
+
+        table: Dict[str, str] = {}
+        other_literals = []
+        # Lowest precedence first, so higher buckets overwrite shared keys
+        for prefix, bucket in reversed(routes):
+            parts = prefix.split("/")
+            if "{" in prefix:
+                other_literals.append(prefix.split("{", 1)[0])
+                continue
+            if len(parts) == 3 and all(parts[1:]):
+                # "/v1/upload" matches "/v1/upload" and "/v1/upload/..."
+                keys = (prefix, prefix + "/")
+            elif len(parts) == 4 and all(parts[1:3]) and not parts[3]:
+                # "/v1/status/" only matches "/v1/status/..."
+                keys = (prefix,)
+            else:
+                other_literals.append(prefix)
+                continue
+            for key in keys:
+                table[key] = bucket
+
+        table = {
+            key: bucket
+            for key, bucket in table.items()
+            if not any(
+                literal.startswith(key.rstrip("/")) or key.startswith(literal)
+                for literal in other_literals
+            )
+        }
+        pattern = "|".join(f"({_route_pattern(prefix)})" for prefix, _ in routes)
+        regex = re.compile(pattern or "(?!)")
+        return table, regex, [bucket for _, bucket in routes]
 
-    def _is_no_auth_path(self, path: str) -> bool:
+    def _get_role_bucket(self, path: str, method: str) -> Optional[str]:
         """
-        Check if the request path is in the no-auth list
+        Find the role bucket ("super_admin", "admin" or "user") for a request
 
         Args:
             path: Request URL path
+            method: HTTP method
 
         Returns:
-            True if path requires no authentication, False otherwise
+            Bucket name, or None if no role route matches
         """
-        return any(path.startswith(no_auth) for no_auth in self.no_auth_paths)
+        matcher = self._role_matchers.get(method)
+        if matcher is None:
+            matcher = self._role_matchers[method] = self._build_role_matcher(method)
+        table, regex, buckets = matcher
+
+        parts = path.split("/", 3)
+        key = "/".join(parts[:3]) + ("/" if len(parts) > 3 else "")
+        bucket = table.get(key)
+        if bucket is None:
+            match = regex.match(path)
+            bucket = buckets[match.lastindex - 1] if match else None
+        return bucket
 
     async def _authenticate_request(self, request: Request) -> Dict[str, Any]:
         """
@@ -212,19 +325,84 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
                 detail="Authentication service unavailable",
             )
 
+        # Tokens are cached by digest so the raw token is never kept as a key
+        token_key = hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+        cached_user_info = self._get_cached_user_info(token_key)
+        if cached_user_info is not None:
+            return cached_user_info
+
         try:
             user_info = self.jwt_service.get_user_info(token)
-            return user_info
+            self._add_role_info(user_info)
+            self._cache_user_info(token_key, user_info)
+            return dict(user_info)
         except HTTPException:
             # Re-raise HTTP exceptions from JWT service
             raise
         except Exception as e:
-            logger.error(f"Token validation failed: {str(e)}")
+            logger.error("Token validation failed: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid or expired token",
             )
 
+    @staticmethod
+    def _add_role_info(user_info: Dict[str, Any]) -> None:
+        """
+        Store the token's roles on user_info as a set and as a bitmask
+
+        Args:
+            user_info: User information returned by the JWT service
+        """
+        token_payload = user_info.get("token_payload", {})
+        role_set = frozenset(token_payload.get("roles", [UserRole.USER.value]) or ())
+        user_info["role_set"] = role_set
+        user_info["role_mask"] = _role_mask(role_set)
+
+    def _get_cached_user_info(self, token_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the user info of a recently validated token
+
+        Args:
+            token_key: Digest of the JWT token
+
+        Returns:
+            Copy of the cached user info, or None if missing or expired
+        """
+        with self._token_cache_lock:
+            entry = self._token_cache.get(token_key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._token_cache[token_key]
+                return None
+            return dict(entry[1])
+
+    def _cache_user_info(self, token_key: str, user_info: Dict[str, Any]) -> None:
+        """
+        Cache validated user info until TOKEN_CACHE_TTL or the token's expiry
+
+        Args:
+            token_key: Digest of the JWT token
+            user_info: User information returned by the JWT service
+        """
+        ttl = self.TOKEN_CACHE_TTL
+        exp = user_info.get("token_payload", {}).get("exp")
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl <= 0:
+            return
+
+        now = time.monotonic()
+        with self._token_cache_lock:
+            if len(self._token_cache) >= self.TOKEN_CACHE_SIZE:
+                # Drop expired entries, then the oldest ones if still full
+                for key in [k for k, v in self._token_cache.items() if v[0] <= now]:
+                    del self._token_cache[key]
+                while len(self._token_cache) >= self.TOKEN_CACHE_SIZE:
+                    del self._token_cache[next(iter(self._token_cache))]
+            self._token_cache[token_key] = (now + ttl, user_info)
+
     def _check_role_access(
         self, path: str, method: str, user_info: Dict[str, Any]
     ) -> None:
@@ -240,67 +418,24 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
             HTTPException: If user lacks required permissions
         """
 
-        # Extract roles from token payload if not in roles array
-        token_payload = user_info.get("token_payload", {})
-        if "roles" in token_payload:
-            user_roles = token_payload.get("roles", [UserRole.USER.value])
-        else:
-            user_roles = [UserRole.USER.value]
+        role_mask = user_info.get("role_mask")
+        if role_mask is None:
+            self._add_role_info(user_info)
+            role_mask = user_info["role_mask"]
 
         # Check if user has any valid role
-        valid_roles = [
-            UserRole.USER.value,
-            UserRole.ADMIN.value,
-            UserRole.SUPER_ADMIN.value,
-        ]
-        if not any(role in user_roles for role in valid_roles):
+        if not role_mask:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Valid user role required"
             )
 
-        # Determine user's highest role level
-        is_super_admin = UserRole.SUPER_ADMIN.value in user_roles
-        is_admin = UserRole.ADMIN.value in user_roles or is_super_admin
-        is_user = UserRole.USER.value in user_roles or is_admin
-
-        # Check Super Admin only paths
-        if any(path.startswith(super_path) for super_path in self.super_admin_paths):
-            if not is_super_admin:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Super Admin access required",
-                )
-            logger.debug(f"Super Admin access granted for {method} {path}")
-            return
-
-        # Check Admin paths (accessible by admin and super admin)
-        if any(path.startswith(admin_path) for admin_path in self.admin_paths):
-            if not is_admin:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Admin access required",
-                )
-            logger.debug(f"Admin access granted for {method} {path}")
-            return
-
-        # Check User paths (accessible by user, admin, and super admin)
-        if any(path.startswith(user_path) for user_path in self.user_paths):
-            if not is_user:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN, detail="User access required"
-                )
-            logger.debug(f"User access granted for {method} {path}")
-            return
+        # Classify the path into its role bucket and check the bit it requires
+        bucket = self._get_role_bucket(path, method)
+        required_bit, detail = _BUCKET_REQUIREMENTS[bucket]
+        if not role_mask & required_bit:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
 
-        # For any other protected paths, require at least user role
-        if not is_user:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail="Authentication required"
-            )
-
-        logger.debug(
-            f"Default access granted for {method} {path} with roles: {user_roles}"
-        )
+        logger.debug("Access granted for %s %s (%s)", method, path, bucket or "default")
 
 
 def get_current_user_from_request(request: Request) -> Dict[str, Any]:
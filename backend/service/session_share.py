@@ -5,18 +5,32 @@ This service handles creating, validating, and revoking share tokens for chat se
 Sessions are private by default. When shared, a token is created that allows public access.
 """
 
-import secrets
 import logging
+import secrets
+import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 from datetime import datetime, timezone, timedelta
 
 logger = logging.getLogger(__name__)
 BACKEND_EXCEPTION_TAG = "BACKEND_EXCEPTION"
+_UTC = timezone.utc
+
+
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp; a trailing "Z" is accepted natively on Python 3.11+."""
+    return datetime.fromisoformat(value)
 
 
 class SessionShareService:
     """Service for managing shareable session links"""
 
+    # Random bytes carried by each share token
+    TOKEN_BYTES = 32
+
+    # Upper bound on share tokens kept by the in-memory fallback
+    MAX_SHARE_TOKENS = 100_000
+
     def __init__(self, chat_history_service=None, bot_id: Optional[str] = None):
         """
         Initialize the session share service with CosmosDB storage via chat history service.
@@ -27,8 +41,13 @@ class SessionShareService:
         """
         self.chat_history_service = chat_history_service
         self.bot_id = bot_id
-        # Fallback in-memory storage for backward compatibility (if chat_history_service not available)
-        self.share_tokens: Dict[str, Dict[str, Any]] = {}
+        # Fallback in-memory storage for backward compatibility (if chat_history_service not available),
+        # in creation order so expired and excess tokens are dropped from the front
+        self.share_tokens: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Secondary indexes over share_tokens; the inner dicts are used as
+        # insertion-ordered sets of share tokens
+        self._by_session: Dict[str, Dict[str, None]] = {}
+        self._by_user: Dict[str, Dict[str, None]] = {}
 
         if self.chat_history_service:
             logger.info(
@@ -63,10 +82,10 @@ class SessionShareService:
         """
         try:
             # Generate a secure random token
-            share_token = secrets.token_urlsafe(32)
+            share_token = secrets.token_urlsafe(self.TOKEN_BYTES)
 
             # Calculate expiration
-            created_at = datetime.now(timezone.utc)
+            created_at = datetime.now(_UTC)
             expires_at = created_at + timedelta(days=expires_in_days)
 
             # Mark session messages as public via PATCH endpoint
@@ -110,8 +129,9 @@ class SessionShareService:
                     "created_at": created_at.isoformat(),
                     "expires_at": expires_at.isoformat(),
                     "is_active": True,
+                    "_expires_at_epoch": expires_at.timestamp(),
                 }
-                self.share_tokens[share_token] = token_metadata
+                self._add_token(share_token, token_metadata)
                 logger.warning(
                     f"[WARNING] [SHARE] Created share token in memory (CosmosDB not available or endpoint not implemented) for session {session_id}"
                 )
@@ -152,6 +172,7 @@ class SessionShareService:
                 )
                 return None
 
+            # Not cached: a revoke on any worker must take effect immediately
             # Query by share_token (no user_id needed)
             result = self.chat_history_service.get_session_metadata_by_share_token(
                 share_token=share_token,
@@ -171,38 +192,14 @@ class SessionShareService:
                 )
                 return None
 
-            # Check if token is expired
-            expires_at_str = metadata.get("share_token_expires_at")
-            if expires_at_str:
-                try:
-                    expires_at = datetime.fromisoformat(
-                        expires_at_str.replace("Z", "+00:00")
-                    )
-                    if datetime.now(timezone.utc) > expires_at:
-                        logger.warning(
-                            f"[WARNING] [SHARE] Share token expired: {share_token[:10]}..."
-                        )
-                        return None
-                except Exception as e:
-                    logger.error(f"[ERROR] [SHARE] Error parsing expiration: {str(e)}")
-                    return None
-
-            # Check if session is still public
-            if not metadata.get("is_public", False):
+            # Returned in the same format as in-memory storage for compatibility
+            token_info = self._validate_metadata(metadata)
+            if token_info is None:
                 logger.warning(
-                    f"[WARNING] [SHARE] Share token is inactive (session no longer public): {share_token[:10]}..."
+                    f"[WARNING] [SHARE] Share token is expired or inactive: {share_token[:10]}..."
                 )
                 return None
-
-            # Return in the same format as in-memory storage for compatibility
-            return {
-                "session_id": metadata.get("SessionID"),
-                "user_id": metadata.get("UserID"),
-                "bot_id": metadata.get("BotID"),
-                "created_at": metadata.get("share_token_created_at"),
-                "expires_at": metadata.get("share_token_expires_at"),
-                "is_active": metadata.get("is_public", False),
-            }
+            return token_info
 
         # Fallback to in-memory storage
         if share_token not in self.share_tokens:
@@ -217,62 +214,135 @@ class SessionShareService:
             return None
 
         # Check if token is expired
-        expires_at_str = token_metadata.get("expires_at")
-        if expires_at_str:
-            try:
-                expires_at = datetime.fromisoformat(
-                    expires_at_str.replace("Z", "+00:00")
-                )
-                if datetime.now(timezone.utc) > expires_at:
-                    logger.warning(
-                        f"[WARNING] [SHARE] Share token expired: {share_token[:10]}..."
-                    )
-                    # Mark as inactive
-                    token_metadata["is_active"] = False
-                    return None
-            except Exception as e:
-                logger.error(f"[ERROR] [SHARE] Error parsing expiration: {str(e)}")
-                return None
+        if time.time() > token_metadata["_expires_at_epoch"]:
+            logger.warning(
+                f"[WARNING] [SHARE] Share token expired: {share_token[:10]}..."
+            )
+            self._remove_token(share_token)
+            return None
 
         return token_metadata
 
-    def _try_get_user_id_from_session(
-        self, session_id: str, bot_id: str
-    ) -> Optional[str]:
+    @staticmethod
+    def _validate_metadata(
+        metadata: Dict[str, Any],
+        *,
+        require_user: Optional[str] = None,
+        require_session: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
         """
-        Try to get user_id from session messages.
-        This is a workaround when user_id is not available but we need to query CosmosDB.
+        Check ownership, expiry and public state of a CosmosDB session share document.
 
-        Note: This requires the chat history service API to support querying by session_id only,
-        or we need to know at least one user_id that might have this session.
+        Args:
+            metadata: Session share metadata returned by the chat history service
+            require_user: Reject the document unless it belongs to this user
+            require_session: Reject the document unless it is for this session
 
         Returns:
-            User ID if found, None otherwise
+            Share info in the in-memory token format (plus share_token) if the
+            share is valid, None otherwise
         """
-        # This is a limitation - we can't query CosmosDB by session_id alone without user_id
-        # The chat history service API would need to support cross-partition queries
-        # For now, return None
-        return None
+        session_id = metadata.get("SessionID")
+        if require_user is not None and metadata.get("UserID") != require_user:
+            return None
+        if require_session is not None and session_id != require_session:
+            return None
 
-    def is_session_public(
+        # Check if session is still public before paying for the expiry parse
+        if not metadata.get("is_public", False):
+            return None
+
+        # Check if the share is expired
+        expires_at = float("inf")
+        expires_at_str = metadata.get("share_token_expires_at")
+        if expires_at_str:
+            try:
+                expires_at = _parse_iso(expires_at_str).timestamp()
+            except Exception:
+                logger.warning(
+                    "%s session_share.expiry_metadata_parse_failed session_id=%s",
+                    BACKEND_EXCEPTION_TAG,
+                    session_id,
+                    exc_info=True,
+                )
+                return None
+            if time.time() > expires_at:
+                return None
+
+        return {
+            "session_id": session_id,
+            "user_id": metadata.get("UserID"),
+            "bot_id": metadata.get("BotID"),
+            "share_token": metadata.get("share_token"),
+            "created_at": metadata.get("share_token_created_at"),
+            "expires_at": expires_at_str,
+            "is_active": True,
+            "_expires_at_epoch": expires_at,
+        }
+
+    def _add_token(self, share_token: str, token_metadata: Dict[str, Any]) -> None:
+        """Store an in-memory share token and index it by session and user."""
+        # Drop expired tokens from the front, and the oldest ones beyond the cap
+        now = time.time()
+        while self.share_tokens:
+            oldest_token, oldest = next(iter(self.share_tokens.items()))
+            if (
+                len(self.share_tokens) < self.MAX_SHARE_TOKENS
+                and now <= oldest["_expires_at_epoch"]
+            ):
+                break
+            self._remove_token(oldest_token)
+
+        self.share_tokens[share_token] = token_metadata
+        session_id = token_metadata["session_id"]
+        self._by_session.setdefault(session_id, {})[share_token] = None
+        self._by_user.setdefault(token_metadata["user_id"], {})[share_token] = None
+
+    def _remove_token(self, share_token: str) -> None:
+        """Delete an in-memory share token and its index entries."""
+        token_metadata = self.share_tokens.pop(share_token, None)
+        if token_metadata is None:
+            return
+        for index, key in (
+            (self._by_session, token_metadata["session_id"]),
+            (self._by_user, token_metadata["user_id"]),
+        ):
+            tokens = index.get(key)
+            if tokens is not None:
+                tokens.pop(share_token, None)
+                if not tokens:
+                    del index[key]
+
+    def _session_tokens(self, session_id: str):
+        """Yield (token, metadata) for the in-memory share tokens of a session."""
+        for token in tuple(self._by_session.get(session_id, ())):
+            token_metadata = self.share_tokens.get(token)
+            if token_metadata is not None:
+                yield token, token_metadata
+
+    def resolve_public_session(
         self,
         session_id: str,
-        user_id: Optional[str] = None,
         bot_id: Optional[str] = None,
         share_token: Optional[str] = None,
-    ) -> bool:
+    ) -> Dict[str, Any]:
         """
-        Check if a session is currently public (has active share token).
+        Resolve whether a session is public and who owns it with a single lookup.
 
         Args:
             session_id: Session identifier
-            user_id: Optional user identifier (if not provided, will try to get from share_token)
             bot_id: Optional bot identifier (uses self.bot_id if not provided)
-            share_token: Optional share token (if provided, will be used to get user_id)
+            share_token: Optional share token (if valid for this session, no further
+                lookup is needed)
 
         Returns:
-            True if session has an active share token, False otherwise
+            Dict containing:
+                - session_id: Session identifier
+                - is_public: True if session has an active share token
+                - user_id: Session owner if the session is public, None otherwise
         """
+        resolved = {"session_id": session_id, "is_public": False, "user_id": None}
+
         # Use CosmosDB if chat history service is available
         if self.chat_history_service:
             bot_id_to_use = bot_id or self.bot_id
@@ -280,133 +350,112 @@ class SessionShareService:
                 logger.error(
                     "[ERROR] [SHARE] bot_id is required for CosmosDB query but not provided"
                 )
-                return False
-
-            # If user_id not provided, try to get it from share_token
-            if not user_id and share_token:
-                token_info = self.get_share_token_info(
-                    share_token, bot_id=bot_id_to_use
-                )
-                if token_info:
-                    user_id = token_info.get("user_id")
-                    # Verify session_id matches
-                    if token_info.get("session_id") != session_id:
-                        logger.warning(
-                            f"[WARNING] [SHARE] Share token session_id mismatch: expected {session_id}, got {token_info.get('session_id')}"
-                        )
-                        return False
+                return resolved
 
-            # Check if session is public by trying to get the public session
-            # get_public_session will only succeed if all messages have public=True
-            result = self.chat_history_service.get_public_session(
-                session_id=session_id,
-                bot_id=bot_id_to_use,
+            # Not cached: user_query uses this answer to decide whether new
+            # messages are stored public, so it must reflect shares created or
+            # revoked on any worker
+            return self._resolve_public_session_remote(
+                session_id, bot_id_to_use, share_token
             )
 
-            if result["success"]:
-                # If we can get the public session, it means all messages have public=True
-                logger.info(
-                    f"[INFO] [SHARE] Session {session_id} is public (all messages have public=True)"
-                )
-                return True
-            else:
-                # Session is not public or doesn't exist
-                logger.debug(
-                    f"[DEBUG] [SHARE] Session {session_id} is not public: {result.get('error', 'Unknown error')}"
-                )
-                return False
-
         # Fallback to in-memory storage
-        for token, metadata in self.share_tokens.items():
-            if metadata.get("session_id") == session_id and metadata.get(
-                "is_active", False
+        now = time.time()
+        for token, metadata in self._session_tokens(session_id):
+            if (
+                metadata.get("is_active", False)
+                and now <= metadata["_expires_at_epoch"]
             ):
-                # Check expiration
-                expires_at_str = metadata.get("expires_at")
-                if expires_at_str:
-                    try:
-                        expires_at = datetime.fromisoformat(
-                            expires_at_str.replace("Z", "+00:00")
-                        )
-                        if datetime.now(timezone.utc) <= expires_at:
-                            return True
-                    except Exception:
-                        logger.warning(
-                            "%s session_share.expiry_validation_failed session_id=%s token=%s",
-                            BACKEND_EXCEPTION_TAG,
-                            session_id,
-                            token,
-                            exc_info=True,
-                        )
+                resolved["is_public"] = True
+                resolved["user_id"] = metadata.get("user_id")
+                break
 
-        return False
+        return resolved
 
-    def get_public_session_user_id(
+    def _resolve_public_session_remote(
+        self, session_id: str, bot_id: str, share_token: Optional[str]
+    ) -> Dict[str, Any]:
+        """Resolve a session's public status and owner through the chat history service."""
+        resolved = {"session_id": session_id, "is_public": False, "user_id": None}
+
+        # A valid share token for this session already proves it is public
+        if share_token:
+            token_info = self.get_share_token_info(share_token, bot_id=bot_id)
+            if token_info:
+                # Verify session_id matches
+                if token_info.get("session_id") != session_id:
+                    logger.warning(
+                        f"[WARNING] [SHARE] Share token session_id mismatch: expected {session_id}, got {token_info.get('session_id')}"
+                    )
+                    return resolved
+                if token_info.get("is_active", False):
+                    resolved["is_public"] = True
+                    resolved["user_id"] = token_info.get("user_id")
+                    return resolved
+
+        # Check if session is public by trying to get the public session
+        # get_public_session will only succeed if all messages have public=True
+        result = self.chat_history_service.get_public_session(
+            session_id=session_id,
+            bot_id=bot_id,
+        )
+
+        if result["success"]:
+            # If we can get the public session, it means all messages have public=True
+            logger.info(
+                f"[INFO] [SHARE] Session {session_id} is public (all messages have public=True)"
+            )
+            messages = (result.get("data") or {}).get("items") or []
+            resolved["is_public"] = True
+            resolved["user_id"] = messages[0].get("UserID") if messages else None
+        else:
+            # Session is not public or doesn't exist
+            logger.debug(
+                f"[DEBUG] [SHARE] Session {session_id} is not public: {result.get('error', 'Unknown error')}"
+            )
+        return resolved
+
+    def is_session_public(
         self,
         session_id: str,
+        user_id: Optional[str] = None,
         bot_id: Optional[str] = None,
         share_token: Optional[str] = None,
-    ) -> Optional[str]:
+    ) -> bool:
         """
-        Get the user_id for a public session (from active share token in CosmosDB).
+        Check if a session is currently public (has active share token).
 
         Args:
             session_id: Session identifier
+            user_id: Optional user identifier (not needed to resolve the session)
             bot_id: Optional bot identifier (uses self.bot_id if not provided)
-            share_token: Optional share token (if provided, will be used to get user_id)
+            share_token: Optional share token (if valid for this session, no further
+                lookup is needed)
 
         Returns:
-            User ID if session is public and has active token, None otherwise
+            True if session has an active share token, False otherwise
         """
-        # Use CosmosDB if chat history service is available
-        if self.chat_history_service:
-            bot_id_to_use = bot_id or self.bot_id
-            if not bot_id_to_use:
-                logger.error(
-                    "[ERROR] [SHARE] bot_id is required for CosmosDB query but not provided"
-                )
-                return None
+        return self.resolve_public_session(session_id, bot_id, share_token)["is_public"]
 
-            # If share_token provided, use it to get user_id
-            if share_token:
-                token_info = self.get_share_token_info(
-                    share_token, bot_id=bot_id_to_use
-                )
-                if token_info and token_info.get("session_id") == session_id:
-                    return token_info.get("user_id")
-
-            # If no share_token, we can't query without user_id
-            # This is a limitation - need share_token or user_id
-            logger.warning(
-                "[WARNING] [SHARE] get_public_session_user_id requires share_token or user_id to query CosmosDB. "
-                "Cannot determine user_id for session."
-            )
-            return None
+    def get_public_session_user_id(
+        self,
+        session_id: str,
+        bot_id: Optional[str] = None,
+        share_token: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Get the user_id for a public session.
 
-        # Fallback to in-memory storage
-        for token, metadata in self.share_tokens.items():
-            if metadata.get("session_id") == session_id and metadata.get(
-                "is_active", False
-            ):
-                # Check expiration
-                expires_at_str = metadata.get("expires_at")
-                if expires_at_str:
-                    try:
-                        expires_at = datetime.fromisoformat(
-                            expires_at_str.replace("Z", "+00:00")
-                        )
-                        if datetime.now(timezone.utc) <= expires_at:
-                            return metadata.get("user_id")
-                    except Exception:
-                        logger.warning(
-                            "%s session_share.expiry_user_lookup_failed session_id=%s token=%s",
-                            BACKEND_EXCEPTION_TAG,
-                            session_id,
-                            token,
-                            exc_info=True,
-                        )
+        Args:
+            session_id: Session identifier
+            bot_id: Optional bot identifier (uses self.bot_id if not provided)
+            share_token: Optional share token (if valid for this session, no further
+                lookup is needed)
 
-        return None
+        Returns:
+            User ID if session is public and has active token, None otherwise
+        """
+        return self.resolve_public_session(session_id, bot_id, share_token)["user_id"]
 
     def get_session_share_info(
         self, session_id: str, user_id: str, bot_id: Optional[str] = None
@@ -438,66 +487,26 @@ class SessionShareService:
             )
 
             if result["success"] and result.get("data"):
-                metadata = result["data"]
-                # Verify it belongs to the user
-                if metadata.get("UserID") != user_id:
-                    return None
-
-                # Check if it's public and not expired
-                if not metadata.get("is_public", False):
-                    return None
-
-                expires_at_str = metadata.get("share_token_expires_at")
-                if expires_at_str:
-                    try:
-                        expires_at = datetime.fromisoformat(
-                            expires_at_str.replace("Z", "+00:00")
-                        )
-                        if datetime.now(timezone.utc) > expires_at:
-                            return None  # Expired
-                    except Exception:
-                        logger.warning(
-                            "%s session_share.expiry_metadata_parse_failed session_id=%s",
-                            BACKEND_EXCEPTION_TAG,
-                            session_id,
-                            exc_info=True,
-                        )
-                        return None
-
-                return {
-                    "share_token": metadata.get("share_token"),
-                    "expires_at": metadata.get("share_token_expires_at"),
-                    "created_at": metadata.get("share_token_created_at"),
-                }
+                share_info = self._validate_metadata(
+                    result["data"], require_user=user_id, require_session=session_id
+                )
+                if share_info:
+                    return {
+                        "share_token": share_info["share_token"],
+                        "expires_at": share_info["expires_at"],
+                        "created_at": share_info["created_at"],
+                    }
 
             return None
 
         # Fallback to in-memory storage
-        for token, metadata in self.share_tokens.items():
+        now = time.time()
+        for token, metadata in self._session_tokens(session_id):
             if (
-                metadata.get("session_id") == session_id
-                and metadata.get("user_id") == user_id
+                metadata.get("user_id") == user_id
                 and metadata.get("is_active", False)
+                and now <= metadata["_expires_at_epoch"]
             ):
-                # Check expiration
-                expires_at_str = metadata.get("expires_at")
-                if expires_at_str:
-                    try:
-                        expires_at = datetime.fromisoformat(
-                            expires_at_str.replace("Z", "+00:00")
-                        )
-                        if datetime.now(timezone.utc) > expires_at:
-                            continue  # Expired, skip
-                    except Exception:
-                        logger.warning(
-                            "%s session_share.expiry_metadata_fallback_parse_failed session_id=%s token=%s",
-                            BACKEND_EXCEPTION_TAG,
-                            session_id,
-                            token,
-                            exc_info=True,
-                        )
-                        continue
-
                 return {
                     "share_token": token,
                     "expires_at": metadata.get("expires_at"),
@@ -542,7 +551,8 @@ class SessionShareService:
                 )
                 return False
 
-            # Also update session share metadata to clear share token info
+            # Only once the messages are private, clear the share token info
+            # in the session share metadata
             result = self.chat_history_service.make_session_public(
                 session_id=session_id,
                 user_id=user_id,
@@ -567,12 +577,9 @@ class SessionShareService:
 
         # Fallback to in-memory storage
         revoked_count = 0
-        for token, metadata in self.share_tokens.items():
-            if (
-                metadata.get("session_id") == session_id
-                and metadata.get("user_id") == user_id
-            ):
-                metadata["is_active"] = False
+        for token, metadata in self._session_tokens(session_id):
+            if metadata.get("user_id") == user_id:
+                self._remove_token(token)
                 revoked_count += 1
                 logger.info(
                     f"[INFO] [SHARE] Revoked share token for session {session_id} by user {user_id}"
@@ -591,17 +598,17 @@ class SessionShareService:
         Returns:
             True if token was revoked, False if not found or not owned by user
         """
-        if share_token not in self.share_tokens:
+        metadata = self.share_tokens.get(share_token)
+        if metadata is None:
             return False
 
-        metadata = self.share_tokens[share_token]
         if metadata.get("user_id") != user_id:
             logger.warning(
                 f"[WARNING] [SHARE] User {user_id} attempted to revoke token owned by {metadata.get('user_id')}"
             )
             return False
 
-        metadata["is_active"] = False
+        self._remove_token(share_token)
         logger.info(
             f"[INFO] [SHARE] Revoked share token {share_token[:10]}... by user {user_id}"
         )
@@ -617,37 +624,16 @@ class SessionShareService:
         Returns:
             List of share token metadata dicts
         """
-        user_shares = []
-        now = datetime.now(timezone.utc)
-
-        for token, metadata in self.share_tokens.items():
-            if metadata.get("user_id") == user_id and metadata.get("is_active", False):
-                # Check expiration
-                expires_at_str = metadata.get("expires_at")
-                if expires_at_str:
-                    try:
-                        expires_at = datetime.fromisoformat(
-                            expires_at_str.replace("Z", "+00:00")
-                        )
-                        if now > expires_at:
-                            continue  # Expired, skip
-                    except Exception:
-                        logger.warning(
-                            "%s session_share.list_user_shares_expiry_parse_failed user_id=%s token=%s",
-                            BACKEND_EXCEPTION_TAG,
-                            user_id,
-                            token,
-                            exc_info=True,
-                        )
-                        continue
-
-                user_shares.append(
-                    {
-                        "share_token": token,
-                        "session_id": metadata.get("session_id"),
-                        "expires_at": metadata.get("expires_at"),
-                        "created_at": metadata.get("created_at"),
-                    }
-                )
-
-        return user_shares
+        now = time.time()
+        return [
+            {
+                "share_token": token,
+                "session_id": metadata["session_id"],
+                "expires_at": metadata["expires_at"],
+                "created_at": metadata["created_at"],
+            }
+            for token in self._by_user.get(user_id, ())
+            if (metadata := self.share_tokens.get(token)) is not None
+            and metadata["is_active"]
+            and now <= metadata["_expires_at_epoch"]
+        ]
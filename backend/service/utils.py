@@ -1,10 +1,22 @@
 # services/utils.py
-from datetime import datetime
 import re
+import time
+
+_SANITIZE_RE = re.compile(r"[^a-zA-Z0-9 _-]")
+_STRIP_CHARS = " _-"
+
+# (epoch second, formatted timestamp) of the last iso_utc_now call
+_iso_utc_cache = (-1, "")
 
 
 def iso_utc_now() -> str:
-    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    global _iso_utc_cache
+    now = int(time.time())
+    cached_at, formatted = _iso_utc_cache
+    if cached_at != now:
+        formatted = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        _iso_utc_cache = (now, formatted)
+    return formatted
 
 
 def sanitize_filename(filename: str) -> str:
@@ -19,15 +31,11 @@ def sanitize_filename(filename: str) -> str:
         Sanitized filename safe for storage
     """
     # Split filename and extension (everything after last '.' is extension)
-    name_parts = filename.rsplit(".", 1)
-    name = name_parts[0]
-    extension = name_parts[1]
-
-    # Remove special characters, keep only alphanumeric, spaces, underscores, and hyphens
-    name = re.sub(r"[^a-zA-Z0-9 _-]", "", name)
-
-    # Remove leading/trailing spaces, underscores or hyphens
-    name = name.strip(" _-")
-
-    # Reconstruct filename with extension
-    return f"{name}.{extension}"
+    name, dot, extension = filename.rpartition(".")
+    if not dot:
+        # No extension: sanitize the whole name
+        return _SANITIZE_RE.sub("", filename).strip(_STRIP_CHARS)
+
+    # Remove special characters, keep only alphanumeric, spaces, underscores, and
+    # hyphens, then remove leading/trailing spaces, underscores or hyphens
+    return f"{_SANITIZE_RE.sub('', name).strip(_STRIP_CHARS)}.{extension}"
@@ -0,0 +1,120 @@
+"""Shared HTTP session for backend API calls.
+
+A single requests.Session keeps TCP/TLS connections to the backend alive
+across calls (and Streamlit reruns) instead of opening a new one per request.
+"""
+
+import hashlib
+import io
+import secrets
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SIZE = 32
+STREAM_CHUNK = 256 * 1024  # Block size used when streaming request bodies
+
+# Only reads are retried (on connection errors and 502/503/504); a DELETE
+# or PUT such as a file delete or factory reset may still be running on the
+# server after a timeout, so it is never sent twice
+_retry = Retry(
+    total=2,
+    backoff_factor=0.2,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=frozenset({"GET", "HEAD"}),
+)
+_adapter = HTTPAdapter(
+    pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=_retry
+)
+
+SESSION = requests.Session()
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+
+def auth_cache_key(headers):
+    """Digest of the caller's Authorization header, for per-user cache keys.
+
+    st.cache_data is shared by every session in the process, so cached
+    backend responses must be keyed by who asked for them.
+    """
+    authorization = headers.get("Authorization", "")
+    return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+
+
+try:
+    import orjson
+
+    def response_json(response):
+        """Parse a JSON response body (orjson fast path for response.json())."""
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            # Raise what response.json() raises so existing handlers still apply
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos) from e
+
+except ImportError:
+    # Fallback if orjson isn't installed
+    def response_json(response):
+        """Parse a JSON response body."""
+        return response.json()
+
+
+class MultipartFileStream:
+    """multipart/form-data body for a single file, read lazily from the file.
+
+    requests sends a file-like body with a known length in blocks, so the
+    file is never copied into an encoded in-memory request body.
+    """
+
+    def __init__(self, field_name, file_obj, filename, content_type):
+        boundary = secrets.token_hex(16)
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        # Quote the filename the way browsers (and urllib3) do
+        filename = (
+            filename.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+        )
+        head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type or 'application/octet-stream'}\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+
+        file_size = file_obj.seek(0, io.SEEK_END)
+        self._length = len(head) + file_size + len(tail)
+        self._head, self._file, self._tail = head, file_obj, tail
+        self.seek(0)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        while chunk := self.read(STREAM_CHUNK):
+            yield chunk
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # Only rewinding is supported; urllib3 uses it to resend the body on retry
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("MultipartFileStream can only rewind")
+        self._file.seek(0)
+        self._parts = [io.BytesIO(self._head), self._file, io.BytesIO(self._tail)]
+        self._pos = 0
+        return 0
+
+    def read(self, size=-1):
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            self._pos += len(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import streamlit as st  # type: ignore
@@ -8,20 +9,20 @@ try:
 except Exception:
     from settings import settings
 
+from ._http import SESSION, MultipartFileStream, auth_cache_key, response_json
 
 logger = logging.getLogger(__name__)
 
+# The backend URL comes from the environment and is fixed for the process
+STATUS_URL_TMPL = f"{settings.backend_base_url}/v1/status/{{}}"
+STATUS_POLL_CONCURRENCY = 16  # Upload status requests in flight at once
+
 
 def get_files_data():
     try:
-        response = requests.get(
-            f"{settings.backend_base_url}/v1/botids/{settings.bot_id}/listfiles",
-            headers=settings.build_headers(),
-        )
-
-        response_data = response.json()
+        headers = settings.build_headers()
         # Return the file_list data, which contains the actual files array
-        return response_data
+        return _fetch_files_data(auth_cache_key(headers), headers)
 
     except requests.exceptions.RequestException:
         return {"files": [], "total_files": 0, "bot_id": settings.bot_id}
@@ -29,6 +30,17 @@ def get_files_data():
         return {"files": [], "total_files": 0, "bot_id": settings.bot_id}
 
 
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch_files_data(auth_key, _headers):
+    # Cached per caller; errors raise, so they are never cached
+    response = SESSION.get(
+        f"{settings.backend_base_url}/v1/botids/{settings.bot_id}/listfiles",
+        headers=_headers,
+    )
+    response.raise_for_status()
+    return response_json(response)
+
+
 def get_stats_data():
     """Get statistics data from backend API"""
     try:
@@ -56,26 +68,36 @@ def get_stats_data():
 
 def get_meta_file_template():
     # Fetches xlsx metadata template from the backend API
-    return requests.get(
+    headers = settings.build_headers()
+    try:
+        return _fetch_meta_file_template(auth_cache_key(headers), headers)
+    except requests.exceptions.HTTPError as e:
+        # Error bodies are passed through as before, but not cached
+        return e.response.content
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_meta_file_template(auth_key, _headers):
+    response = SESSION.get(
         f"{settings.backend_base_url}/v1/metadata-template",
-        headers=settings.build_headers(),
-    ).content
+        headers=_headers,
+    )
+    response.raise_for_status()
+    return response.content
 
 
 def upload_file(file_obj):
     # Uploads a file (and optional metadata) to the backend API
-    files = {"file": (file_obj.name, file_obj.getvalue(), file_obj.type)}
-
     try:
-        # Create headers without Content-Type (requests will set it automatically for multipart/form-data)
+        # Stream the multipart body from the file object rather than building
+        # it (plus a getvalue() copy of the file) in memory
+        body = MultipartFileStream("file", file_obj, file_obj.name, file_obj.type)
         upload_headers = settings.build_headers().copy()
-        upload_headers.pop(
-            "Content-Type", None
-        )  # Remove Content-Type to let requests set it with boundary
+        upload_headers["Content-Type"] = body.content_type
 
-        response = requests.post(
+        response = SESSION.post(
             f"{settings.backend_base_url}/v1/upload",
-            files=files,
+            data=body,
             headers=upload_headers,
             timeout=10,
         )
@@ -84,13 +106,14 @@ def upload_file(file_obj):
         if st.session_state.get("worker_id") is None:
             st.session_state["worker_id"] = []
 
-        response_data = response.json()
+        response_data = response_json(response)
 
         # Check for work_id (regular files) or worker_id (if API changes)
         worker_id = response_data.get("work_id") or response_data.get("worker_id", "")
 
         if worker_id:  # Only append if worker_id is not empty
             st.session_state["worker_id"].append(worker_id)
+        _fetch_files_data.clear()
         return response_data  # Return the response data
 
     except requests.exceptions.RequestException as e:
@@ -98,16 +121,17 @@ def upload_file(file_obj):
         return None
 
 
-def get_upload_status(worker_id):
-    # Fetches the upload status from the backend API
+def get_upload_status(worker_id, headers=None):
+    # Fetches the upload status from the backend API; pollers pass headers
+    # built once per poll instead of rebuilding them for every worker
     try:
-        response = requests.get(
-            f"{settings.backend_base_url}/v1/status/{worker_id}",
-            headers=settings.build_headers(),
+        response = SESSION.get(
+            STATUS_URL_TMPL.format(worker_id),
+            headers=headers or settings.build_headers(),
             timeout=10,
         )
         response.raise_for_status()  # Raises HTTPError for bad status codes
-        return response.json()
+        return response_json(response)
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 404:
             # Treat 404 as completed (worker no longer exists)
@@ -135,15 +159,28 @@ def get_upload_status(worker_id):
         }
 
 
+def get_upload_status_batch(worker_ids):
+    # Fetches the upload status of several workers concurrently, keyed by worker_id
+    if not worker_ids:
+        return {}
+    # Session state is only readable from the script thread, so build headers here
+    headers = settings.build_headers()
+    workers = min(STATUS_POLL_CONCURRENCY, len(worker_ids))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = executor.map(lambda wid: get_upload_status(wid, headers), worker_ids)
+        return dict(zip(worker_ids, statuses))
+
+
 def delete_file(file_name):
     """Delete a file from the backend"""
     try:
-        response = requests.delete(
+        response = SESSION.delete(
             f"{settings.backend_base_url}/v1/files/{file_name}",
             headers=settings.build_headers(),
             timeout=10,
         )
         response.raise_for_status()
+        _fetch_files_data.clear()
         return True
     except requests.exceptions.RequestException as e:
         st.error(f"Delete failed: {str(e)}")
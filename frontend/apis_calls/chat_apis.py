@@ -1,5 +1,6 @@
+import itertools
 import logging
-import uuid
+import secrets
 
 import requests
 
@@ -8,24 +9,31 @@ try:
 except Exception:  # Fallback when running with CWD=frontend
     from settings import settings
 
+from ._http import SESSION, response_json
+
 
 logger = logging.getLogger(__name__)
 
+# 64 random bits per process keep IDs unique across replicas and restarts;
+# the counter makes each new ID within the process unique for free
+_MESSAGE_ID_PREFIX = secrets.token_hex(8)
+_message_id_counter = itertools.count()
+
 
 def fetch_llm_result(prompt, sessionID="asdasew12313"):
-    message_id = str(uuid.uuid4())
+    message_id = f"{_MESSAGE_ID_PREFIX}-{next(_message_id_counter):012x}"
     header = settings.build_headers(sessionID, message_id)
     payload = {"text": prompt}
 
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{settings.backend_base_url}/v1/query",
             headers=header,
             json=payload,
             timeout=30,
         )
         if response.status_code == 200:
-            result = response.json()
+            result = response_json(response)
 
             # Return the full result dict so callers can access `data` and `references`
             # e.g. callers can read result["data"]["markdown"] and result.get("references", [])
@@ -1,5 +1,8 @@
 import logging
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Dict, Any, List, Optional
 
 import requests
 import streamlit as st  # type: ignore
@@ -9,6 +12,8 @@ try:
 except Exception:
     from settings import settings
 
+from ._http import SESSION, response_json
+
 
 logger = logging.getLogger(__name__)
 
@@ -40,13 +45,9 @@ def add_message_to_session(
     Returns:
         Dict[str, Any]: The new message object
     """
-    import datetime
-
     new_message = {
         "BotID": bot_id,
-        "created_at": datetime.datetime.now(datetime.timezone.utc).strftime(
-            "%Y-%m-%dT%H:%M:%SZ"
-        ),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
         "id": message_id,
         "query": query,
         "response": response,
@@ -103,10 +104,10 @@ def get_session_titles(
         # Add query parameters
         params = {"after_timestamp": after_timestamp, "limit": limit}
 
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = SESSION.get(url, headers=headers, params=params, timeout=10)
 
         if response.status_code == 200:
-            result = response.json()
+            result = response_json(response)
             session_title_map = result.get("SessionID_title_map", {})
 
             if "session_titles" not in st.session_state:
@@ -185,10 +186,10 @@ def update_message_feedback(
             "feedback": feedback,
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = SESSION.post(url, headers=headers, json=payload, timeout=30)
 
         if response.status_code == 200:
-            result = response.json()
+            result = response_json(response)
             return {
                 "success": result.get("success", False),
                 "message": result.get("message", ""),
@@ -243,7 +244,7 @@ def export_chat_history(
             "period": period,
         }
         # Make the POST request to export endpoint
-        response = requests.post(
+        response = SESSION.post(
             f"{settings.backend_base_url}/v1/chat/export",
             json=payload,
             headers=header,
@@ -256,7 +257,7 @@ def export_chat_history(
 
             if "application/json" in content_type:
                 # JSON response
-                result = response.json()
+                result = response_json(response)
                 items = result.get("items", [])
                 total_count = result.get("total_count", 0)
 
@@ -318,6 +319,9 @@ def export_chat_history(
         }
 
 
+_created_at = itemgetter("created_at")
+
+
 def get_session_messages(user_id: str, session_id: str) -> list:
     """
     Get all messages for a specific session by calling the backend session details endpoint.
@@ -329,24 +333,31 @@ def get_session_messages(user_id: str, session_id: str) -> list:
     Returns:
         list: All messages for the session, sorted by timestamp
     """
-    try:
-        auth_token = st.session_state.get("id_token", "")
-        headers = settings.build_headers(None, auth_token)
+    auth_token = st.session_state.get("id_token", "")
+    return _fetch_session_messages(session_id, settings.build_headers(None, auth_token))
+
 
+def _fetch_session_messages(session_id: str, headers: Dict[str, str]) -> list:
+    """Fetch one session's messages with the given request headers."""
+    try:
         url = f"{settings.backend_base_url}/v1/session/{session_id}"
 
-        response = requests.get(url, headers=headers, timeout=30)
+        response = SESSION.get(url, headers=headers, timeout=30)
 
         if response.status_code == 200:
-            result = response.json()
+            result = response_json(response)
 
             if result.get("success") and result.get("data"):
                 session_data = result["data"]
 
                 # Check if messages are included in the response
                 if "messages" in session_data:
+                    # The list was just decoded from JSON, so sort it in place
                     messages = session_data["messages"]
-                    return sorted(messages, key=lambda x: x.get("created_at", ""))
+                    for message in messages:
+                        message.setdefault("created_at", "")
+                    messages.sort(key=_created_at)
+                    return messages
                 else:
                     logger.warning(
                         "[WARN] Backend session details endpoint doesn't include messages"
@@ -411,10 +422,10 @@ def create_session_share(session_id: str, expires_in_days: int = 30) -> Dict[str
         # Optional payload for expiration days
         payload = {"expires_in_days": expires_in_days} if expires_in_days else None
 
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = SESSION.post(url, headers=headers, json=payload, timeout=30)
 
         if response.status_code == 200:
-            result = response.json()
+            result = response_json(response)
             return {
                 "success": result.get("success", False),
                 "share_token": result.get("share_token", ""),
@@ -447,7 +458,7 @@ def create_session_share(session_id: str, expires_in_days: int = 30) -> Dict[str
         }
 
 
-STREAM_IMAGE_CHUNK = 256 * 1024  # 256KB keeps memory low while downloading images
+IMAGE_FETCH_CONCURRENCY = 8  # Images of one response downloaded at the same time
 
 
 def get_image(image_path: str) -> Dict[str, Any]:
@@ -471,51 +482,73 @@ def get_image(image_path: str) -> Dict[str, Any]:
                 "status_code": 404
             }
     """
-    try:
-        auth_token = st.session_state.get("id_token", "")
-        headers = settings.build_headers(None, auth_token)
+    auth_token = st.session_state.get("id_token", "")
+    return _fetch_image(image_path, settings.build_headers(None, auth_token))
 
+
+def get_images(image_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Retrieve several images from the backend image endpoint concurrently.
+
+    Args:
+        image_paths (List[str]): The image paths/blob names to retrieve
+
+    Returns:
+        Dict[str, Dict[str, Any]]: get_image result for each distinct image path
+    """
+    unique_paths = list(dict.fromkeys(image_paths))
+    if not unique_paths:
+        return {}
+
+    # Session state is only readable from the script thread, so build headers here
+    auth_token = st.session_state.get("id_token", "")
+    headers = settings.build_headers(None, auth_token)
+
+    workers = min(IMAGE_FETCH_CONCURRENCY, len(unique_paths))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda path: _fetch_image(path, headers), unique_paths)
+        return dict(zip(unique_paths, results))
+
+
+def _fetch_image(image_path: str, headers: Dict[str, str]) -> Dict[str, Any]:
+    """Download one image with the given request headers (see get_image)."""
+    try:
         # Replace / with : to avoid APIM routing issues
         encoded_image_path = image_path.replace("/", "~")
 
         url = f"{settings.backend_base_url}/v1/image/{encoded_image_path}"
 
-        with requests.get(url, headers=headers, timeout=30, stream=True) as response:
-            if response.status_code == 200:
-                content_type = response.headers.get("content-type", "image/png")
-                content_disposition = response.headers.get("content-disposition", "")
-
-                # Extract filename from Content-Disposition header if available
-                filename = "image"
-                if "filename=" in content_disposition:
-                    filename = content_disposition.split("filename=")[1].strip('"')
-                else:
-                    # Fallback to extracting from image_path
-                    filename = (
-                        image_path.split("/")[-1] if "/" in image_path else image_path
-                    )
-
-                buffer = bytearray()
-                for chunk in response.iter_content(STREAM_IMAGE_CHUNK):
-                    if chunk:
-                        buffer.extend(chunk)
+        response = SESSION.get(url, headers=headers, timeout=30)
+        if response.status_code == 200:
+            content_type = response.headers.get("content-type", "image/png")
+            content_disposition = response.headers.get("content-disposition", "")
 
-                return {
-                    "success": True,
-                    "content": bytes(buffer),
-                    "content_type": content_type,
-                    "filename": filename,
-                }
+            # Extract filename from Content-Disposition header if available
+            filename = "image"
+            if "filename=" in content_disposition:
+                filename = content_disposition.split("filename=")[1].strip('"')
             else:
-                error_message = (
-                    f"Error fetching image: {response.status_code} - {response.text}"
+                # Fallback to extracting from image_path
+                filename = (
+                    image_path.split("/")[-1] if "/" in image_path else image_path
                 )
-                logger.error(error_message)
-                return {
-                    "success": False,
-                    "error": error_message,
-                    "status_code": response.status_code,
-                }
+
+            return {
+                "success": True,
+                "content": response.content,
+                "content_type": content_type,
+                "filename": filename,
+            }
+        else:
+            error_message = (
+                f"Error fetching image: {response.status_code} - {response.text}"
+            )
+            logger.error(error_message)
+            return {
+                "success": False,
+                "error": error_message,
+                "status_code": response.status_code,
+            }
 
     except requests.exceptions.RequestException as e:
         error_message = f"Request error fetching image: {str(e)}"
@@ -4,6 +4,7 @@ API calls for bot statistics endpoints
 
 import requests
 import logging
+import streamlit as st
 from typing import Dict, Any, Optional
 
 try:
@@ -11,9 +12,22 @@ try:
 except Exception:
     from settings import settings
 
+from ._http import SESSION, auth_cache_key, response_json
+
 logger = logging.getLogger(__name__)
 
 TIMEOUT = 30
+VALID_TIME_RANGES = ("today", "this_week", "this_month")
+_VALID_TIME_RANGE_SET = frozenset(VALID_TIME_RANGES)
+_VALID_TIME_RANGES_TEXT = ", ".join(VALID_TIME_RANGES)
+
+
+class _FailedStatistics(Exception):
+    """Carries a failed result out of the cache so it is not stored."""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error"))
+        self.result = result
 
 
 def get_bot_statistics(
@@ -22,6 +36,8 @@ def get_bot_statistics(
     """
     Get bot statistics for a specific time period.
 
+    Successful results are cached for 60s per caller, bot_id and time_range.
+
     Args:
         bot_id: The bot identifier
         time_range: Time period filter - 'today', 'this_week', or 'this_month'
@@ -33,13 +49,36 @@ def get_bot_statistics(
         - data: Dict with bot statistics (total_messages, total_active_users, etc.)
         - error: Error message if operation failed
     """
+    # Use create_headers if no headers provided
+    request_headers = headers or settings.build_headers()
+    try:
+        return _cached_bot_statistics(
+            bot_id, time_range, auth_cache_key(request_headers), request_headers
+        )
+    except _FailedStatistics as e:
+        return e.result
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_bot_statistics(
+    bot_id: str, time_range: str, auth_key: str, _headers: Dict[str, str]
+) -> Dict[str, Any]:
+    result = _request_bot_statistics(bot_id, time_range, _headers)
+    if not result["success"]:
+        raise _FailedStatistics(result)
+    return result
+
+
+def _request_bot_statistics(
+    bot_id: str, time_range: str, request_headers: Dict[str, str]
+) -> Dict[str, Any]:
+    """Fetch bot statistics from the backend (see get_bot_statistics)."""
     try:
         # Validate time_range parameter
-        valid_ranges = ["today", "this_week", "this_month"]
-        if time_range not in valid_ranges:
+        if time_range not in _VALID_TIME_RANGE_SET:
             return {
                 "success": False,
-                "error": f"Invalid time_range '{time_range}'. Must be one of: {', '.join(valid_ranges)}",
+                "error": f"Invalid time_range '{time_range}'. Must be one of: {_VALID_TIME_RANGES_TEXT}",
             }
 
         # Validate bot_id
@@ -50,16 +89,13 @@ def get_bot_statistics(
         url = f"{settings.backend_base_url}/v1/bots/{bot_id}/statistics"
         params = {"time_range": time_range}
 
-        # Use create_headers if no headers provided
-        request_headers = headers or settings.build_headers()
-
         # Make HTTP GET request
-        response = requests.get(
+        response = SESSION.get(
             url, params=params, headers=request_headers, timeout=TIMEOUT
         )
 
         if response.status_code == 200:
-            result = response.json()
+            result = response_json(response)
 
             # Extract statistics data
             if result.get("success") and "data" in result:
@@ -73,7 +109,7 @@ def get_bot_statistics(
         else:
             # Handle HTTP error responses
             try:
-                error_response = response.json()
+                error_response = response_json(response)
                 error_msg = error_response.get(
                     "message", f"HTTP {response.status_code}"
                 )
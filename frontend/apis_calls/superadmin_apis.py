@@ -10,6 +10,8 @@ try:
 except Exception:
     from settings import settings
 
+from ._http import SESSION
+
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +25,7 @@ def get_bot_config():
 
         # Add no-cache header and a cache-busting query param to avoid stale assets
         HEADERS["Cache-Control"] = "no-cache"
-        response = requests.get(
+        response = SESSION.get(
             f"{BACKEND_API_BASE_URL}/v1/config",
             headers=HEADERS,
             params={"_ts": int(time.time())},
@@ -84,7 +86,7 @@ def update_bot_config(new_config):
         BACKEND_API_BASE_URL = settings.backend_base_url
 
         # Send bot_id as query parameter and config as body
-        response = requests.put(
+        response = SESSION.put(
             f"{BACKEND_API_BASE_URL}/v1/updateconfig",
             json=new_config,
             headers=HEADERS,
@@ -145,7 +147,7 @@ def save_image_to_storage(image_type: str, file_obj) -> dict:
     }
 
     # PUT /v1/updateconfig with minimal body
-    resp = requests.put(
+    resp = SESSION.put(
         f"{BASE_URL}/v1/updateconfig", json=payload, headers=HEADERS, timeout=60
     )
     try:
@@ -169,7 +171,7 @@ def factory_reset():
         BACKEND_API_BASE_URL = settings.backend_base_url
 
         # Make DELETE request to factory reset endpoint
-        response = requests.delete(
+        response = SESSION.delete(
             f"{BACKEND_API_BASE_URL}/v1/reset-factory-new",
             headers=HEADERS,
             timeout=120,  # Longer timeout as this can take a while
@@ -15,6 +15,7 @@ from apis_calls.session_apis import (
     add_message_to_session,
     update_message_feedback,
     get_image,
+    get_images,
 )
 from navigation.pdf_viewer import display_citations_with_viewer
 from manager.tab_manager import update_tab_title
@@ -67,6 +68,17 @@ def safe_display_image_thumbnail(image_data, caption="Image", unique_key=""):
             images_list = getattr(image_data, "images", [])
 
         if images_list:
+            # Download the group's images concurrently before rendering them
+            image_urls = []
+            for img in images_list:
+                if isinstance(img, dict):
+                    image_urls.append(img.get("image_data_url"))
+                else:
+                    image_urls.append(getattr(img, "image_data_url", None))
+            image_results = get_images(
+                [url for url in image_urls if url and url != "#"]
+            )
+
             # Display all images in this group as thumbnails
             for img_idx, img in enumerate(images_list):
                 # Handle both dict and object format for ImageData
@@ -86,7 +98,7 @@ def safe_display_image_thumbnail(image_data, caption="Image", unique_key=""):
                 )
 
                 if image_url and image_url != "#":
-                    image_result = get_image(image_url)
+                    image_result = image_results[image_url]
                     if image_result.get("success"):
                         # Show thumbnail
                         st.image(
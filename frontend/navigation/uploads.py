@@ -1,7 +1,7 @@
 import streamlit as st
 from apis_calls.admin_apis import get_meta_file_template
 from apis_calls.admin_apis import upload_file
-from apis_calls.admin_apis import get_upload_status
+from apis_calls.admin_apis import get_upload_status_batch
 
 
 import pandas as pd
@@ -88,8 +88,8 @@ def upload_progress_dataframe():
         status_data = []
         active_workers = []  # Track workers that are still active
 
-        for worker_id in st.session_state["worker_id"]:
-            status = get_upload_status(worker_id)
+        statuses = get_upload_status_batch(st.session_state["worker_id"])
+        for worker_id, status in statuses.items():
             status_data.append(
                 {
                     "Worker ID": worker_id,
@@ -240,13 +240,19 @@ if st.session_state.get("worker_id") is None:
 if st.session_state.get("worker_id"):
     # Check if any workers are still active (not completed/failed)
     active_workers_on_load = []
+    try:
+        statuses = get_upload_status_batch(st.session_state["worker_id"])
+    except Exception:
+        # If we can't check status, assume they might still be active
+        statuses = {}
     for worker_id in st.session_state["worker_id"]:
-        try:
-            status = get_upload_status(worker_id)
-            if status.get("status") not in ["completed", "success", "failed", "error"]:
-                active_workers_on_load.append(worker_id)
-        except Exception:
-            # If we can't check status, assume it might still be active
+        status = statuses.get(worker_id)
+        if status is None or status.get("status") not in [
+            "completed",
+            "success",
+            "failed",
+            "error",
+        ]:
             active_workers_on_load.append(worker_id)
 
     # If no active workers found, clean up the worker_id list